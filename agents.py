@@ -1,41 +1,252 @@
-import requests
+from typing import Callable, Dict, List, Optional, Sequence
+
+from balancer import ReplicaBalancer
+from models import AgentType, BalancingStrategy
+from streaming import StreamDecoder, is_streamed
+from transport import AgentTransport, default_transport
 
 ELIZAOS_API_ENDPOINT = "http://localhost:8080/elizaOS-eliza"
 TRON_API_ENDPOINT = "http://localhost:8080/elizaOS-eliza"
 GOOSE_API_ENDPOINT = "http://localhost:8080/block-goose"
 
+# Multi-query endpoints ({"queries": [...]} in, {"results": [...]} out); None where an agent has none
+ELIZAOS_BATCH_ENDPOINT = None
+TRON_BATCH_ENDPOINT = None
+GOOSE_BATCH_ENDPOINT = None
+
+# Ask the endpoint to stream its answer (SSE or NDJSON), so text reaches stream_mode="custom" consumers as it arrives
+ELIZAOS_STREAMING = False
+TRON_STREAMING = False
+GOOSE_STREAMING = False
+
+# Further endpoints serving the same agent; calls are balanced across them and the main endpoint
+ELIZAOS_REPLICA_ENDPOINTS: List[str] = []
+TRON_REPLICA_ENDPOINTS: List[str] = []
+GOOSE_REPLICA_ENDPOINTS: List[str] = []
+
 # API keys for the framework endpoints
 ELIZAOS_API_KEY = "your-elizaos-api-key-here"
 TRON_API_KEY = "your-tron-api-key-here"
 GOOSE_API_KEY = "your-goose-api-key-here"
 
 class BaseAgent:
-    def __init__(self, api_endpoint: str, api_key: str):
+    # Shown to the agent selector LLM when deciding which agents a query needs
+    description = "General purpose framework agent"
+    # Words that name this agent in a query; the local router sends such queries straight to it
+    keywords = ()
+    
+    def __init__(
+        self,
+        api_endpoint: str,
+        api_key: str,
+        hedge_endpoint: Optional[str] = None,
+        transport: Optional[AgentTransport] = None,
+        streaming: bool = False,
+        batch_endpoint: Optional[str] = None,
+        replicas: Sequence[str] = (),
+        balancing: BalancingStrategy = BalancingStrategy.LEAST_OUTSTANDING
+    ):
         self.api_endpoint = api_endpoint
         self.api_key = api_key
+        # Endpoints serving this agent; add() and remove() on it as replicas join and leave
+        self.replicas = ReplicaBalancer([api_endpoint, *replicas], balancing)
+        # Hedged duplicates go here when set, otherwise to a different replica than the call they hedge
+        self.hedge_endpoint = hedge_endpoint
+        # Pooled keep-alive connections, shared with the other agents by default
+        self.transport = transport or default_transport()
+        # Ask the endpoint to stream its answer (SSE or NDJSON) and pass on the text as it arrives
+        self.streaming = streaming
+        # Accepts several queries per request; the manager batches calls to it when batching is on
+        self.batch_endpoint = batch_endpoint
+    
+    def _headers(self) -> dict:
+        return {
+            # "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
         
-    def process(self, query: str) -> dict:
-        """Send query to API and get response"""
+    def pick_endpoint(self) -> str:
+        """Replica the balancer would send the next call to"""
+        return self.replicas.pick()
+    
+    def hedge_target(self, endpoint: str) -> str:
+        """Where to send a hedged duplicate of a call made to `endpoint`"""
+        return self.hedge_endpoint or self.replicas.pick(exclude=endpoint)
+    
+    def process(self, query: str, endpoint: Optional[str] = None, on_chunk: Optional[Callable[[str], None]] = None) -> dict:
+        """Send query to API and get response.
+
+        Without an endpoint, the call goes to the least loaded replica. A streaming agent calls
+        on_chunk with each piece of text as it arrives; if the call then fails, the result keeps
+        the text received so far as "partial_response".
+        """
+        with self.replicas.track(endpoint) as call:
+            if self.streaming:
+                result = self._process_stream(query, call.endpoint, on_chunk)
+            else:
+                result = self._process_once(query, call.endpoint)
+            if not result["success"]:
+                call.failed()
+        return result
+    
+    async def aprocess(self, query: str, endpoint: Optional[str] = None, on_chunk: Optional[Callable[[str], None]] = None) -> dict:
+        """Send query to API and get response without blocking the event loop"""
+        with self.replicas.track(endpoint) as call:
+            if self.streaming:
+                result = await self._aprocess_stream(query, call.endpoint, on_chunk)
+            else:
+                result = await self._aprocess_once(query, call.endpoint)
+            if not result["success"]:
+                call.failed()
+        return result
+    
+    def _process_once(self, query: str, endpoint: str) -> dict:
+        try:
+            payload = {"query": query}
+            response = self.transport.post(endpoint, self._headers(), payload)
+            response.raise_for_status()
+            return {"success": True, "result": response.json()["result"]}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def _aprocess_once(self, query: str, endpoint: str) -> dict:
         try:
-            headers = {
-                # "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
             payload = {"query": query}
-            response = requests.post(self.api_endpoint, headers=headers, json=payload)
+            response = await self.transport.apost(endpoint, self._headers(), payload)
             response.raise_for_status()
             return {"success": True, "result": response.json()["result"]}
         except Exception as e:
             return {"success": False, "error": str(e)}
+    
+    @staticmethod
+    def _batch_results(items: List[dict], expected: int) -> List[dict]:
+        if len(items) != expected:
+            raise ValueError(f"Batch endpoint returned {len(items)} results for {expected} queries")
+        return [
+            {"success": True, "result": item["result"]} if "result" in item
+            else {"success": False, "error": item.get("error", "No result for this query")}
+            for item in items
+        ]
+    
+    def process_batch(self, queries: List[str]) -> List[dict]:
+        """Send several queries in one request to the batch endpoint; returns one result per query, in order"""
+        try:
+            response = self.transport.post(self.batch_endpoint, self._headers(), {"queries": queries})
+            response.raise_for_status()
+            return self._batch_results(response.json()["results"], len(queries))
+        except Exception as e:
+            return [{"success": False, "error": str(e)}] * len(queries)
+    
+    async def aprocess_batch(self, queries: List[str]) -> List[dict]:
+        """Async version of process_batch"""
+        try:
+            response = await self.transport.apost(self.batch_endpoint, self._headers(), {"queries": queries})
+            response.raise_for_status()
+            return self._batch_results(response.json()["results"], len(queries))
+        except Exception as e:
+            return [{"success": False, "error": str(e)}] * len(queries)
+    
+    @staticmethod
+    def _failed_stream(error: Exception, decoder: Optional[StreamDecoder]) -> dict:
+        result = {"success": False, "error": str(error)}
+        if decoder is not None and decoder.text:
+            result["partial_response"] = decoder.text
+        return result
+    
+    def _process_stream(self, query: str, endpoint: str, on_chunk: Optional[Callable[[str], None]]) -> dict:
+        decoder = None
+        try:
+            payload = {"query": query, "stream": True}
+            with self.transport.stream(endpoint, self._headers(), payload) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                if not is_streamed(content_type):  # The endpoint answered in one piece
+                    response.read()
+                    return {"success": True, "result": response.json()["result"]}
+                decoder = StreamDecoder(content_type)
+                for line in response.iter_lines():
+                    delta = decoder.feed(line)
+                    if delta and on_chunk is not None:
+                        on_chunk(delta)
+                    if decoder.done:
+                        break
+            delta = decoder.finish()
+            if delta and on_chunk is not None:
+                on_chunk(delta)
+            return {"success": True, "result": decoder.text}
+        except Exception as e:
+            return self._failed_stream(e, decoder)
+    
+    async def _aprocess_stream(self, query: str, endpoint: str, on_chunk: Optional[Callable[[str], None]]) -> dict:
+        decoder = None
+        try:
+            payload = {"query": query, "stream": True}
+            async with self.transport.astream(endpoint, self._headers(), payload) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                if not is_streamed(content_type):
+                    await response.aread()
+                    return {"success": True, "result": response.json()["result"]}
+                decoder = StreamDecoder(content_type)
+                async for line in response.aiter_lines():
+                    delta = decoder.feed(line)
+                    if delta and on_chunk is not None:
+                        on_chunk(delta)
+                    if decoder.done:
+                        break
+            delta = decoder.finish()
+            if delta and on_chunk is not None:
+                on_chunk(delta)
+            return {"success": True, "result": decoder.text}
+        except Exception as e:
+            return self._failed_stream(e, decoder)
 
 class ElizaOSAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(ELIZAOS_API_ENDPOINT, ELIZAOS_API_KEY)
+    description = "Specializes in the ElizaOS framework, which excels at AI-driven operating systems, file system operations, and pattern matching"
+    keywords = ("elizaos", "eliza")
+    
+    def __init__(self, transport: Optional[AgentTransport] = None):
+        super().__init__(
+            ELIZAOS_API_ENDPOINT,
+            ELIZAOS_API_KEY,
+            transport=transport,
+            streaming=ELIZAOS_STREAMING,
+            batch_endpoint=ELIZAOS_BATCH_ENDPOINT,
+            replicas=ELIZAOS_REPLICA_ENDPOINTS
+        )
 
 class TronAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(TRON_API_ENDPOINT, TRON_API_KEY)
+    description = "Specializes in the Tron framework, which focuses on grid-based algorithms, lightweight memory management, and real-time processing"
+    keywords = ("tron",)
+    
+    def __init__(self, transport: Optional[AgentTransport] = None):
+        super().__init__(
+            TRON_API_ENDPOINT,
+            TRON_API_KEY,
+            transport=transport,
+            streaming=TRON_STREAMING,
+            batch_endpoint=TRON_BATCH_ENDPOINT,
+            replicas=TRON_REPLICA_ENDPOINTS
+        )
 
 class GooseAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(GOOSE_API_ENDPOINT, GOOSE_API_KEY)
\ No newline at end of file
+    description = "Specializes in the Goose framework, which is known for distributed processing, fault tolerance, and scalable solutions"
+    keywords = ("goose",)
+    
+    def __init__(self, transport: Optional[AgentTransport] = None):
+        super().__init__(
+            GOOSE_API_ENDPOINT,
+            GOOSE_API_KEY,
+            transport=transport,
+            streaming=GOOSE_STREAMING,
+            batch_endpoint=GOOSE_BATCH_ENDPOINT,
+            replicas=GOOSE_REPLICA_ENDPOINTS
+        )
+
+def default_framework_agents(transport: Optional[AgentTransport] = None) -> Dict[AgentType, BaseAgent]:
+    """The built-in agent registry; pass e.g. AgentTransport(TransportConfig(http2=True)) to multiplex their calls"""
+    return {
+        AgentType.ELIZAOS: ElizaOSAgent(transport),
+        AgentType.TRON: TronAgent(transport),
+        AgentType.GOOSE: GooseAgent(transport)
+    }
@@ -1,17 +1,40 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Header
 from pydantic import BaseModel
 
-from main import query_manager_agent
+from main import get_manager_runtime, query_manager_agent
+from models import AggregationStrategy, CompletionPolicy
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the runtime, including its token encoding, before serving and off the event loop
+    await asyncio.to_thread(get_manager_runtime)
+    yield
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Aggregation tier forced for every request made with an API key, e.g. {"batch-client-key": AggregationStrategy.FAST}
+API_KEY_AGGREGATION: Dict[str, AggregationStrategy] = {}
 
 # Sample data model
 class Query(BaseModel):
     query: str
+    policy: Optional[CompletionPolicy] = None  # Finalize early on a deadline and/or quorum
+
+def request_policy(policy: Optional[CompletionPolicy], api_key: Optional[str]) -> Optional[CompletionPolicy]:
+    """Apply the API key's aggregation override, unless the request chose a strategy itself"""
+    override = API_KEY_AGGREGATION.get(api_key) if api_key else None
+    if override is None or (policy is not None and policy.aggregation is not None):
+        return policy
+    return CompletionPolicy.model_validate({**(policy or CompletionPolicy()).model_dump(), "aggregation": override})
 
 
 @app.post("/query")
-async def get_items(req: Query):
-    result = await query_manager_agent(req.query)
-    return {"result": result}
+async def get_items(req: Query, x_api_key: Optional[str] = Header(default=None)):
+    result = await query_manager_agent(req.query, policy=request_policy(req.policy, x_api_key))
+    # The task ledger is an index, not a model; respond with the plain list of tasks
+    return {"result": {**result, "tasks": list(result["tasks"])}}
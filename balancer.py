@@ -0,0 +1,130 @@
+import contextlib
+import random
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from models import BalancingStrategy
+
+class Replica:
+    """Load and latency of one endpoint serving an agent"""
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.outstanding = 0
+        self.ewma: Optional[float] = None  # Seconds; None until a call has finished
+        self.calls = 0
+        self.failures = 0
+
+class ReplicaCall:
+    """Handle for one call; mark it failed so the replica is penalized"""
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.success = True
+
+    def failed(self):
+        self.success = False
+
+class ReplicaBalancer:
+    """Spreads an agent's calls over the endpoints serving it.
+
+    LEAST_OUTSTANDING picks the replica with the fewest calls in flight. EWMA picks the lowest
+    expected wait: its moving-average latency times the calls it would then have in flight.
+    Ties are broken at random. Replicas can be added and removed while calls are running.
+    """
+    def __init__(
+        self,
+        endpoints: Iterable[str],
+        strategy: BalancingStrategy = BalancingStrategy.LEAST_OUTSTANDING,
+        decay: float = 0.3
+    ):
+        self.strategy = strategy
+        self.decay = decay  # Weight of the newest latency in the moving average
+        self._replicas: Dict[str, Replica] = {}
+        self._lock = threading.Lock()
+        for endpoint in endpoints:
+            self.add(endpoint)
+        if not self._replicas:
+            raise ValueError("A balancer needs at least one endpoint")
+
+    @property
+    def endpoints(self) -> List[str]:
+        with self._lock:
+            return list(self._replicas)
+
+    def add(self, endpoint: str):
+        with self._lock:
+            self._replicas.setdefault(endpoint, Replica(endpoint))
+
+    def remove(self, endpoint: str):
+        """Stop sending calls to the endpoint; calls already running there finish normally"""
+        with self._lock:
+            if endpoint in self._replicas and len(self._replicas) == 1:
+                raise ValueError("Cannot remove the last endpoint")
+            self._replicas.pop(endpoint, None)
+
+    def _pick(self, exclude: Optional[str]) -> Replica:
+        candidates = [replica for replica in self._replicas.values() if replica.endpoint != exclude]
+        if not candidates:  # The excluded endpoint is the only one
+            candidates = list(self._replicas.values())
+        if self.strategy == BalancingStrategy.EWMA:
+            # Replicas without a latency yet are assumed as fast as the fastest known one
+            known = [replica.ewma for replica in candidates if replica.ewma is not None]
+            default = min(known, default=0.0)
+            costs = [
+                ((default if replica.ewma is None else replica.ewma) * (replica.outstanding + 1), replica.outstanding)
+                for replica in candidates
+            ]
+        else:
+            costs = [(replica.outstanding, replica.ewma or 0.0) for replica in candidates]
+        best = min(costs)
+        return random.choice([replica for replica, cost in zip(candidates, costs) if cost == best])
+
+    def pick(self, exclude: Optional[str] = None) -> str:
+        """Endpoint the next call should go to, other than `exclude` when there is a choice"""
+        with self._lock:
+            return self._pick(exclude).endpoint
+
+    @contextlib.contextmanager
+    def track(self, endpoint: Optional[str] = None) -> Iterator[ReplicaCall]:
+        """Count a call as in flight while the block runs and record its latency when it finishes.
+
+        Without an endpoint, one is picked and reserved in the same step, so concurrent calls
+        spread out. Calls that raise (e.g. are cancelled) leave the latency average untouched.
+        """
+        with self._lock:
+            replica = self._replicas.get(endpoint) if endpoint else self._pick(None)
+            if replica is not None:
+                replica.outstanding += 1
+        call = ReplicaCall(replica.endpoint if replica is not None else endpoint)
+        started_at = time.monotonic()
+        finished = False
+        try:
+            yield call
+            finished = True
+        finally:
+            if replica is not None:
+                self._finish(replica, time.monotonic() - started_at, call.success if finished else None)
+
+    def _finish(self, replica: Replica, latency: float, success: Optional[bool]):
+        with self._lock:
+            replica.outstanding -= 1
+            if success is None:
+                return
+            replica.calls += 1
+            if not success:
+                replica.failures += 1
+                # A replica failing fast must not look faster than a healthy one
+                latency = max(latency, 2 * (replica.ewma or latency))
+            replica.ewma = latency if replica.ewma is None else self.decay * latency + (1 - self.decay) * replica.ewma
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                endpoint: {
+                    "outstanding": replica.outstanding,
+                    "calls": replica.calls,
+                    "failures": replica.failures,
+                    "ewma_ms": round(replica.ewma * 1000, 1) if replica.ewma is not None else None
+                }
+                for endpoint, replica in self._replicas.items()
+            }
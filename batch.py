@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from main import ManagerRuntime, get_manager_runtime
+from models import CompletionPolicy, ExecutionMode
+
+def read_queries(lines: Iterable[str]) -> Iterator[str]:
+    """Yield queries from JSONL lines ({"query": ...}) or plain text lines, skipping blank lines"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            yield json.loads(line)["query"]
+        else:
+            yield line
+
+class BatchStats:
+    """Running totals for a batch, updated as results stream out"""
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.completed = 0
+        self.errors = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Queries finished per second"""
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> str:
+        return (f"{self.completed} queries ({self.errors} errors) in {self.elapsed:.1f}s "
+                f"= {self.throughput:.2f} queries/s")
+
+def summarize_result(index: int, query: str, result: dict, elapsed: float) -> dict:
+    """Reduce a final graph state to a JSON-serializable record"""
+    return {
+        "index": index,
+        "query": query,
+        "final_output": result["final_output"],
+        "tasks": [
+            {"agent_type": str(task.agent_type), "status": task.status.value, "error": task.error}
+            for task in result["tasks"]
+        ],
+        "tokens_saved": result["tokens_saved"],
+        "elapsed_ms": round(elapsed * 1000, 1)
+    }
+
+async def run_batch(
+    queries: Iterable[str],
+    runtime: Optional[ManagerRuntime] = None,
+    concurrency: int = 8,
+    mode: ExecutionMode = ExecutionMode.PARALLEL,
+    speculative: bool = False,
+    policy: Optional[CompletionPolicy] = None,
+    stats: Optional[BatchStats] = None
+) -> AsyncIterator[dict]:
+    """Run queries through one shared runtime, yielding a record per query as soon as it finishes.
+
+    At most `concurrency` queries are in flight, and queries are pulled from the iterable lazily,
+    so arbitrarily long streams run in constant memory. Records arrive in completion order;
+    use their "index" to restore input order. A query that raises yields a record with "error".
+    """
+    runtime = runtime or get_manager_runtime()
+    stats = stats or BatchStats()
+    source = enumerate(queries)
+    results = asyncio.Queue(maxsize=concurrency)
+
+    async def worker():
+        # Workers share one iterator; next() never awaits, so each query is taken exactly once
+        for index, query in source:
+            start = time.perf_counter()
+            try:
+                result = await runtime.arun(query, mode, speculative, policy)
+                record = summarize_result(index, query, result, time.perf_counter() - start)
+            except Exception as e:
+                record = {"index": index, "query": query, "error": str(e)}
+            await results.put(record)
+
+    async def run_workers():
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            await results.put(None)
+
+    runner = asyncio.create_task(run_workers())
+    try:
+        while True:
+            record = await results.get()
+            if record is None:
+                break
+            stats.completed += 1
+            stats.errors += "error" in record
+            yield record
+        # Surface any failure outside a single query
+        await runner
+    finally:
+        if not runner.done():
+            runner.cancel()
+
+async def run_batch_file(args):
+    stats = BatchStats()
+    policy = None
+    if args.deadline_ms is not None or args.min_completed is not None:
+        policy = CompletionPolicy(deadline_ms=args.deadline_ms, min_completed=args.min_completed)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        with open(args.output, "w", encoding="utf-8") as output:
+            batch = run_batch(
+                read_queries(source),
+                runtime=get_manager_runtime(args.model),
+                concurrency=args.concurrency,
+                mode=ExecutionMode(args.mode),
+                speculative=args.speculative,
+                policy=policy,
+                stats=stats
+            )
+            async for record in batch:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                if stats.completed % args.report_every == 0:
+                    print(f"[Batch] {stats.report()}", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    print(f"[Batch] Done: {stats.report()}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a batch of queries through the framework manager')
+    parser.add_argument('input', help='JSONL file of {"query": ...} objects or one query per line; - for stdin')
+    parser.add_argument('--output', default='batch_results.jsonl', help='JSONL file results are streamed to')
+    parser.add_argument('--concurrency', type=int, default=8, help='Maximum queries in flight')
+    parser.add_argument('--mode', choices=[mode.value for mode in ExecutionMode], default=ExecutionMode.PARALLEL.value)
+    parser.add_argument('--speculative', action='store_true', help='Start agents while the selector runs')
+    parser.add_argument('--deadline-ms', type=int, default=None)
+    parser.add_argument('--min-completed', type=int, default=None)
+    parser.add_argument('--model', default='deepseek-reasoner', help='Aggregator model')
+    parser.add_argument('--report-every', type=int, default=100, help='Print throughput every N queries')
+    args = parser.parse_args()
+
+    asyncio.run(run_batch_file(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+from agents import BaseAgent
+from models import BatchingPolicy
+
+class PendingBatch:
+    """Queries collected for one multi-query request; identical queries share a slot"""
+    def __init__(self):
+        self.queries: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self.results: Optional[List[dict]] = None
+        self.done = threading.Event()  # Set once results are in, for sync callers
+        self.future: Optional[asyncio.Future] = None  # Resolved with the results, for async callers
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.sender: Optional[asyncio.Task] = None  # Held so the send is not garbage collected
+
+    def add(self, query: str) -> int:
+        """Slot of the query's result"""
+        slot = self._slots.get(query)
+        if slot is None:
+            slot = self._slots[query] = len(self.queries)
+            self.queries.append(query)
+        return slot
+
+class AgentBatcher:
+    """Sends concurrent calls to one agent as multi-query requests to its batch endpoint.
+
+    The first call opens a batch and waits up to `policy.window_ms` for others to join. The batch
+    is sent as one request when the window ends or `policy.max_batch` queries have joined, and
+    each caller gets its own query's result back.
+    """
+    def __init__(self, agent: BaseAgent, policy: BatchingPolicy):
+        self.agent = agent
+        self.policy = policy
+        self.calls = 0
+        self.requests = 0
+        self._batch: Optional[PendingBatch] = None
+        self._async_batches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PendingBatch]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _failed(batch: PendingBatch, error: Exception) -> List[dict]:
+        return [{"success": False, "error": str(error)}] * len(batch.queries)
+
+    def call(self, query: str) -> dict:
+        with self._lock:
+            self.calls += 1
+            batch = self._batch
+            if batch is None:
+                batch = self._batch = PendingBatch()
+                timer = threading.Timer(self.policy.window_ms / 1000, self._flush, args=(batch,))
+                timer.daemon = True
+                timer.start()
+            slot = batch.add(query)
+            full = len(batch.queries) >= self.policy.max_batch
+            if full:
+                self._batch = None
+        if full:
+            self._send(batch)
+        batch.done.wait()
+        return batch.results[slot]
+
+    def _flush(self, batch: PendingBatch):
+        with self._lock:
+            if self._batch is not batch:  # Already sent because it filled up
+                return
+            self._batch = None
+        self._send(batch)
+
+    def _send(self, batch: PendingBatch):
+        with self._lock:
+            self.requests += 1
+        try:
+            batch.results = self.agent.process_batch(batch.queries)
+        except Exception as e:
+            batch.results = self._failed(batch, e)
+        batch.done.set()
+
+    async def acall(self, query: str) -> dict:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.calls += 1
+        batch = self._async_batches.get(loop)
+        if batch is None:
+            batch = self._async_batches[loop] = PendingBatch()
+            batch.future = loop.create_future()
+            batch.timer = loop.call_later(self.policy.window_ms / 1000, self._aflush, loop, batch)
+        slot = batch.add(query)
+        if len(batch.queries) >= self.policy.max_batch:
+            batch.timer.cancel()
+            self._aflush(loop, batch)
+        # Shielded: a caller giving up (e.g. at its deadline) must not cancel the others' results
+        results = await asyncio.shield(batch.future)
+        return results[slot]
+
+    def _aflush(self, loop: asyncio.AbstractEventLoop, batch: PendingBatch):
+        if self._async_batches.get(loop) is batch:
+            del self._async_batches[loop]
+        batch.sender = loop.create_task(self._asend(batch))
+
+    async def _asend(self, batch: PendingBatch):
+        with self._lock:
+            self.requests += 1
+        try:
+            results = await self.agent.aprocess_batch(batch.queries)
+        except Exception as e:
+            results = self._failed(batch, e)
+        batch.future.set_result(results)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "requests": self.requests,
+                "mean_batch": self.calls / self.requests if self.requests else 0.0
+            }
@@ -0,0 +1,562 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set
+
+import httpx
+import numpy as np
+import requests
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_deepseek import ChatDeepSeek
+
+from agents import BaseAgent
+from main import (
+    FrameworkManagerAgent,
+    ManagerRuntime,
+    create_framework_manager_graph,
+    initial_manager_state,
+    simulate_api_response
+)
+from models import (
+    AgentId, AgentTask, AgentType, BalancingStrategy, BatchingPolicy, CompletionPolicy, ExecutionMode, HedgingPolicy, TaskStatus,
+    TransportConfig
+)
+from prompt_cache import PromptPrefixError, check_prompt_prefixes, render, static_prefix
+from semantic_cache import LSHIndex, VectorIndex
+from transport import AgentTransport
+
+class StubAgent(BaseAgent):
+    """Agent that answers with simulate_api_response after a simulated latency.
+
+    With probability tail_probability a call takes tail_latency instead, to model a slow endpoint.
+    """
+    def __init__(self, agent_type: AgentId, latency: float, tail_latency: float = 0.0, tail_probability: float = 0.0):
+        super().__init__(f"stub://{agent_type}", "")
+        self.agent_type = agent_type
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+
+    def _latency(self) -> float:
+        return self.tail_latency if random.random() < self.tail_probability else self.latency
+
+    def _response(self, query: str) -> dict:
+        if isinstance(self.agent_type, AgentType):
+            return simulate_api_response(self.agent_type, query)
+        return {"success": True, "result": f"{self.agent_type} response to '{query}'"}
+
+    def process(self, query: str, endpoint: Optional[str] = None, on_chunk=None) -> dict:
+        time.sleep(self._latency())
+        return self._response(query)
+
+    async def aprocess(self, query: str, endpoint: Optional[str] = None, on_chunk=None) -> dict:
+        await asyncio.sleep(self._latency())
+        return self._response(query)
+
+class StubManagerAgent(FrameworkManagerAgent):
+    """Manager with the LLM and agent endpoints replaced by fixed-latency stubs"""
+    def __init__(
+        self,
+        agent_latency: float = 0.1,
+        selector_latency: float = 0.0,
+        required_agents: int = None,
+        hedging: Optional[HedgingPolicy] = None,
+        tail_latency: float = 0.0,
+        tail_probability: float = 0.0,
+        agent_count: Optional[int] = None
+    ):
+        # The three built-in agents by default, or agent_count generic ones
+        agent_ids = list(AgentType) if agent_count is None else [f"agent-{index:03d}" for index in range(agent_count)]
+        stub_llm = FakeListChatModel(responses=["stub"])
+        super().__init__(
+            llm=stub_llm,
+            selector_llm=stub_llm,
+            hedging=hedging,
+            framework_agents={
+                agent_id: StubAgent(agent_id, agent_latency, tail_latency, tail_probability)
+                for agent_id in agent_ids
+            }
+        )
+        self.selector_latency = selector_latency
+        self.required_agents = required_agents
+
+    def determine_required_agents(self, query: str) -> Set[AgentType]:
+        time.sleep(self.selector_latency)
+        return set(list(self.framework_agents.keys())[:self.required_agents])
+
+    async def adetermine_required_agents(self, query: str) -> Set[AgentType]:
+        await asyncio.sleep(self.selector_latency)
+        return set(list(self.framework_agents.keys())[:self.required_agents])
+
+    def aggregate_responses(self, query: str, completed_tasks: List[AgentTask], strategy=None) -> str:
+        return "\n\n".join(task.response for task in completed_tasks if task.status == TaskStatus.COMPLETED)
+
+    async def aaggregate_responses(self, query: str, completed_tasks: List[AgentTask], strategy=None) -> str:
+        return self.aggregate_responses(query, completed_tasks)
+
+def time_graph(graph, query: str, runs: int) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        graph.invoke(initial_manager_state(query))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def report(label: str, timings: List[float]):
+    print(f"{label:<20} mean={statistics.mean(timings) * 1000:8.1f}ms  "
+          f"min={min(timings) * 1000:8.1f}ms  max={max(timings) * 1000:8.1f}ms")
+
+def bench_modes(args):
+    """Compare the sequential agent loop with the parallel fan-out, with and without speculation"""
+    manager = StubManagerAgent(
+        agent_latency=args.agent_latency,
+        selector_latency=args.selector_latency,
+        required_agents=args.required_agents
+    )
+    print(f"{len(manager.framework_agents)} agents, {args.agent_latency * 1000:.0f}ms simulated latency each, "
+          f"{args.selector_latency * 1000:.0f}ms selector, {args.runs} runs")
+    for mode in ExecutionMode:
+        for speculative in (False, True):
+            graph = create_framework_manager_graph(None, mode, manager=manager, speculative=speculative)
+            label = f"{mode.value}+spec" if speculative else mode.value
+            report(label, time_graph(graph, args.query, args.runs))
+
+def bench_concurrency(args):
+    """Serve many concurrent queries from one event loop through graph.ainvoke"""
+    manager = StubManagerAgent(agent_latency=args.agent_latency)
+    graph = create_framework_manager_graph(None, ExecutionMode(args.mode), manager=manager)
+
+    async def run_all():
+        start = time.perf_counter()
+        await asyncio.gather(*(graph.ainvoke(initial_manager_state(args.query)) for _ in range(args.requests)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run_all())
+    print(f"{args.requests} concurrent requests ({args.mode}) in {elapsed * 1000:.1f}ms "
+          f"= {args.requests / elapsed:.1f} requests/s on one event loop")
+
+def bench_runtime(args):
+    """Compare per-request setup (the old query_manager_agent path) with a reused ManagerRuntime"""
+    # Clients are only constructed here, never called, so a placeholder key is enough
+    os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark-placeholder")
+    mode = ExecutionMode(args.mode)
+
+    cold = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        llm = ChatDeepSeek(model="deepseek-reasoner")
+        create_framework_manager_graph(llm, mode, manager=FrameworkManagerAgent(llm))
+        cold.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    runtime = ManagerRuntime()
+    runtime.graph(mode)
+    startup = time.perf_counter() - start
+
+    warm = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        runtime.graph(mode)
+        warm.append(time.perf_counter() - start)
+
+    print(f"Runtime startup (once per process): {startup * 1000:.1f}ms")
+    report("per-request", cold)
+    report("reused", warm)
+
+def percentile(timings: List[float], pct: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+def bench_hedging(args):
+    """Compare agent-call tail latency with and without hedged requests"""
+    policy = HedgingPolicy(percentile=args.percentile, budget=args.budget)
+    print(f"{args.calls} calls, {args.agent_latency * 1000:.0f}ms usual latency, "
+          f"{args.tail_probability:.0%} at {args.tail_latency * 1000:.0f}ms; hedge at p{args.percentile:g}, budget {args.budget:.0%}")
+    for hedging in (None, policy):
+        manager = StubManagerAgent(
+            agent_latency=args.agent_latency,
+            hedging=hedging,
+            tail_latency=args.tail_latency,
+            tail_probability=args.tail_probability
+        )
+
+        async def run_calls():
+            timings = []
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                await manager.aprocess_with_agent(AgentType.GOOSE, args.query)
+                timings.append(time.perf_counter() - start)
+            return timings
+
+        timings = asyncio.run(run_calls())
+        label = "hedged" if hedging else "unhedged"
+        print(f"{label:<16} p50={percentile(timings, 50) * 1000:7.1f}ms  p99={percentile(timings, 99) * 1000:7.1f}ms  "
+              f"mean={statistics.mean(timings) * 1000:7.1f}ms")
+        if hedging:
+            print(f"{'':<16} {manager.hedgers[AgentType.GOOSE].stats()}")
+
+def bench_scale(args):
+    """Orchestration cost per request as the agent registry grows"""
+    print(f"{args.agent_latency * 1000:.0f}ms simulated latency per agent, {args.runs} runs, node output suppressed")
+    for agent_count in args.agents:
+        manager = StubManagerAgent(agent_latency=args.agent_latency, agent_count=agent_count)
+        for mode in ExecutionMode:
+            graph = create_framework_manager_graph(None, mode, manager=manager)
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                timings = time_graph(graph, args.query, args.runs)
+            report(f"{agent_count} {mode.value}", timings)
+
+def direct_request(manager: FrameworkManagerAgent, query: str):
+    """The work of one request without LangGraph: the floor the graph modes are measured against"""
+    tasks = [AgentTask(agent_type=agent_id, query=query) for agent_id in manager.determine_required_agents(query)]
+    completed = manager.process_tasks(tasks, CompletionPolicy(), time.monotonic())
+    return manager.aggregate_responses(query, completed)
+
+async def adirect_request(manager: FrameworkManagerAgent, query: str):
+    tasks = [AgentTask(agent_type=agent_id, query=query) for agent_id in await manager.adetermine_required_agents(query)]
+    completed = await manager.aprocess_tasks(tasks, CompletionPolicy(), time.monotonic())
+    return await manager.aaggregate_responses(query, completed)
+
+def bench_overhead(args):
+    """Pure orchestration cost per request, with zero-latency stub LLM and agents"""
+    manager = StubManagerAgent(agent_latency=0.0, required_agents=args.required_agents)
+
+    def measure(run) -> List[float]:
+        timings = []
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+        return timings
+
+    def measure_async(arun) -> List[float]:
+        async def runs():
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                await arun()
+                timings.append(time.perf_counter() - start)
+            return timings
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            return asyncio.run(runs())
+
+    def report_us(label: str, timings: List[float], floor: float):
+        mean = statistics.mean(timings)
+        print(f"{label:<20} mean={mean * 1e6:8.0f}us  p50={percentile(timings, 50) * 1e6:8.0f}us  "
+              f"overhead={(mean - floor) * 1e6:8.0f}us")
+
+    print(f"{args.required_agents} required agent(s), {args.runs} runs, stdout suppressed")
+    direct = measure(lambda: direct_request(manager, args.query))
+    adirect = measure_async(lambda: adirect_request(manager, args.query))
+    report_us("direct", direct, statistics.mean(direct))
+    report_us("direct async", adirect, statistics.mean(adirect))
+    for mode in ExecutionMode:
+        graph = create_framework_manager_graph(None, mode, manager=manager)
+        report_us(mode.value, measure(lambda: graph.invoke(initial_manager_state(args.query))), statistics.mean(direct))
+        report_us(f"{mode.value} async", measure_async(lambda: graph.ainvoke(initial_manager_state(args.query))),
+                  statistics.mean(adirect))
+
+def bench_semantic_index(args):
+    """Lookup latency and recall of the exact and LSH vector indexes for the semantic answer cache"""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.entries, args.dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Paraphrase stand-ins: stored vectors with noise added, so each query has a known nearest entry
+    targets = rng.integers(0, args.entries, args.lookups)
+    queries = vectors[targets] + args.noise * rng.standard_normal((args.lookups, args.dimensions)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"{args.entries} entries, {args.dimensions} dimensions, {args.lookups} lookups")
+    for label, index in (("exact", VectorIndex(args.dimensions)), ("lsh", LSHIndex(args.dimensions))):
+        slots = [index.add(vector) for vector in vectors]
+        timings, found = [], 0
+        for target, query in zip(targets, queries):
+            start = time.perf_counter()
+            slot, _ = index.search(query)
+            timings.append(time.perf_counter() - start)
+            found += slot == slots[target]
+        report(label, timings)
+        print(f"{'':<20} recall@1={found / args.lookups:.1%}")
+
+PREFIX_SAMPLE_QUERIES = [
+    "How do I watch a directory for changes with ElizaOS?",
+    "Compare Tron and Goose for a real-time, fault tolerant job queue",
+    "write a goose worker that retries failed tasks",
+]
+
+def bench_prompt_prefix(args):
+    """Offline check that the selector and aggregator prompts share a byte-identical prefix across queries"""
+    llm = FakeListChatModel(responses=[""])
+    manager = FrameworkManagerAgent(llm, selector_llm=llm)
+    prompts = {
+        "selector": (manager.agent_selector_prompt, [{"query": query} for query in PREFIX_SAMPLE_QUERIES]),
+        "aggregator": (manager.response_aggregator_prompt, [
+            {"query": query, "agent_responses": f"TRON AGENT:\nResponse {index}"}
+            for index, query in enumerate(PREFIX_SAMPLE_QUERIES)
+        ])
+    }
+    for name, (prompt, samples) in prompts.items():
+        try:
+            check_prompt_prefixes(prompt, samples)
+        except PromptPrefixError as e:
+            sys.exit(f"{name}: {e}")
+        prefix = static_prefix(prompt, samples)
+        total = len("\n".join(render(prompt, samples[0])).encode())
+        print(f"{name:<20} static prefix {len(prefix.encode())} of {total} bytes, identical across {len(samples)} queries")
+
+class UnpooledTransport:
+    """The previous behaviour: a new connection, and for async calls a new client, per request"""
+    def post(self, url: str, headers: dict, payload: dict):
+        return requests.post(url, headers=headers, json=payload)
+
+    async def apost(self, url: str, headers: dict, payload: dict):
+        async with httpx.AsyncClient(timeout=None) as client:
+            return await client.post(url, headers=headers, json=payload)
+
+@contextlib.contextmanager
+def stand_in_server(port: int, *options: str):
+    process = subprocess.Popen([sys.executable, "stand_in_agent.py", "--port", str(port), *options])
+    url = f"http://127.0.0.1:{port}/stand-in"
+    try:
+        for _ in range(100):
+            try:
+                requests.post(url, json={"query": "ping"}, timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("Stand-in agent server did not start")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+def bench_transport(args):
+    """Throughput of agent calls against a local stand-in server, with and without pooled connections"""
+    transports = [("unpooled", UnpooledTransport()), ("pooled", AgentTransport())]
+    if args.http2:
+        transports.append(("http2", AgentTransport(TransportConfig(http2=True))))
+    options = ["--latency", str(args.latency)] + (["--http2"] if args.http2 else [])
+    with stand_in_server(args.port, *options) as url:
+        for label, transport in transports:
+            agent = BaseAgent(url, "", transport=transport)
+
+            def timed_call() -> float:
+                start = time.perf_counter()
+                result = agent.process(args.query)
+                assert result["success"], result
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                timings = list(pool.map(lambda _: timed_call(), range(args.calls)))
+            elapsed = time.perf_counter() - start
+            report(label, timings)
+            print(f"{'':<20} {args.calls / elapsed:.0f} calls/s with {args.concurrency} threads")
+
+            async def atimed_call(semaphore: asyncio.Semaphore) -> float:
+                async with semaphore:
+                    start = time.perf_counter()
+                    result = await agent.aprocess(args.query)
+                    assert result["success"], result
+                    return time.perf_counter() - start
+
+            async def run_calls() -> List[float]:
+                semaphore = asyncio.Semaphore(args.concurrency)
+                return await asyncio.gather(*(atimed_call(semaphore) for _ in range(args.calls)))
+
+            start = time.perf_counter()
+            timings = asyncio.run(run_calls())
+            elapsed = time.perf_counter() - start
+            report(f"{label} async", timings)
+            print(f"{'':<20} {args.calls / elapsed:.0f} calls/s with {args.concurrency} in flight")
+
+def bench_batching(args):
+    """Throughput of concurrent agent calls through the manager, one request per call versus batched"""
+    options = ["--latency", str(args.latency), "--query-latency", str(args.query_latency), "--slots", str(args.slots)]
+    with stand_in_server(args.port, *options) as url:
+        agent = BaseAgent(url, "", batch_endpoint=f"{url}/batch")
+        llm = FakeListChatModel(responses=[""])
+        policies = (("unbatched", None), ("batched", BatchingPolicy(window_ms=args.window_ms, max_batch=args.max_batch)))
+        print(f"{args.calls} calls, {args.concurrency} in flight; server: {args.latency * 1000:.0f}ms per request "
+              f"+ {args.query_latency * 1000:.0f}ms per query, {args.slots} slots")
+        for label, batching in policies:
+            manager = FrameworkManagerAgent(
+                llm, selector_llm=llm, framework_agents={AgentType.GOOSE: agent}, batching=batching
+            )
+            # Distinct queries, so identical ones are not merged within a batch
+            queries = [f"{args.query} #{index}" for index in range(args.calls)]
+
+            def timed_call(query: str) -> float:
+                start = time.perf_counter()
+                result = manager.process_with_agent(AgentType.GOOSE, query)
+                assert result["success"], result
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                timings = list(pool.map(timed_call, queries))
+            elapsed = time.perf_counter() - start
+            report(label, timings)
+            print(f"{'':<20} {args.calls / elapsed:.0f} calls/s")
+
+            async def atimed_call(semaphore: asyncio.Semaphore, query: str) -> float:
+                async with semaphore:
+                    start = time.perf_counter()
+                    result = await manager.aprocess_with_agent(AgentType.GOOSE, query)
+                    assert result["success"], result
+                    return time.perf_counter() - start
+
+            async def run_calls() -> List[float]:
+                semaphore = asyncio.Semaphore(args.concurrency)
+                return await asyncio.gather(*(atimed_call(semaphore, query) for query in queries))
+
+            start = time.perf_counter()
+            timings = asyncio.run(run_calls())
+            elapsed = time.perf_counter() - start
+            report(f"{label} async", timings)
+            print(f"{'':<20} {args.calls / elapsed:.0f} calls/s")
+            if batching:
+                print(f"{'':<20} {manager.batchers[AgentType.GOOSE].stats()}")
+
+def bench_replicas(args):
+    """Throughput and latency of agent calls spread over replicas of differing speed"""
+    latencies = args.replica_latency
+    with contextlib.ExitStack() as stack:
+        urls = [
+            stack.enter_context(stand_in_server(args.port + index, "--latency", str(latency), "--slots", str(args.slots)))
+            for index, latency in enumerate(latencies)
+        ]
+        print(f"{args.calls} calls, {args.concurrency} in flight; replicas at "
+              f"{', '.join(f'{latency * 1000:.0f}ms' for latency in latencies)}, {args.slots} slots each")
+        setups = [("single", urls[:1], BalancingStrategy.LEAST_OUTSTANDING)] + [
+            (strategy.value, urls, strategy) for strategy in BalancingStrategy
+        ]
+        for label, endpoints, strategy in setups:
+            agent = BaseAgent(endpoints[0], "", replicas=endpoints[1:], balancing=strategy)
+
+            async def atimed_call(semaphore: asyncio.Semaphore) -> float:
+                async with semaphore:
+                    start = time.perf_counter()
+                    result = await agent.aprocess(args.query)
+                    assert result["success"], result
+                    return time.perf_counter() - start
+
+            async def run_calls() -> List[float]:
+                semaphore = asyncio.Semaphore(args.concurrency)
+                return await asyncio.gather(*(atimed_call(semaphore) for _ in range(args.calls)))
+
+            start = time.perf_counter()
+            timings = asyncio.run(run_calls())
+            elapsed = time.perf_counter() - start
+            print(f"{label:<20} p50={percentile(timings, 50) * 1000:8.1f}ms  p99={percentile(timings, 99) * 1000:8.1f}ms  "
+                  f"{args.calls / elapsed:.0f} calls/s")
+            print(f"{'':<20} calls per replica: {[stats['calls'] for stats in agent.replicas.stats().values()]}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the framework manager graph with stubbed agents')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    modes_parser = subparsers.add_parser('modes', help='Compare sequential and parallel execution modes')
+    modes_parser.add_argument('--runs', type=int, default=5)
+    modes_parser.add_argument('--agent-latency', type=float, default=0.1,
+                              help='Simulated latency of each agent call in seconds')
+    modes_parser.add_argument('--selector-latency', type=float, default=0.0,
+                              help='Simulated latency of the agent selector call in seconds')
+    modes_parser.add_argument('--required-agents', type=int, default=None,
+                              help='How many agents the stub selector keeps (default: all)')
+    modes_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    modes_parser.set_defaults(func=bench_modes)
+
+    concurrency_parser = subparsers.add_parser('concurrency', help='Run concurrent queries through the async graph')
+    concurrency_parser.add_argument('--requests', type=int, default=50)
+    concurrency_parser.add_argument('--mode', choices=[mode.value for mode in ExecutionMode], default=ExecutionMode.PARALLEL.value)
+    concurrency_parser.add_argument('--agent-latency', type=float, default=0.1,
+                                    help='Simulated latency of each agent call in seconds')
+    concurrency_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    concurrency_parser.set_defaults(func=bench_concurrency)
+
+    runtime_parser = subparsers.add_parser('runtime', help='Measure setup cost saved by reusing ManagerRuntime')
+    runtime_parser.add_argument('--runs', type=int, default=20)
+    runtime_parser.add_argument('--mode', choices=[mode.value for mode in ExecutionMode], default=ExecutionMode.SEQUENTIAL.value)
+    runtime_parser.set_defaults(func=bench_runtime)
+
+    hedging_parser = subparsers.add_parser('hedging', help='Measure tail latency with hedged agent requests')
+    hedging_parser.add_argument('--calls', type=int, default=500)
+    hedging_parser.add_argument('--agent-latency', type=float, default=0.01)
+    hedging_parser.add_argument('--tail-latency', type=float, default=0.2)
+    hedging_parser.add_argument('--tail-probability', type=float, default=0.03)
+    hedging_parser.add_argument('--percentile', type=float, default=95.0)
+    hedging_parser.add_argument('--budget', type=float, default=0.05)
+    hedging_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    hedging_parser.set_defaults(func=bench_hedging)
+
+    scale_parser = subparsers.add_parser('scale', help='Measure orchestration cost at growing agent counts')
+    scale_parser.add_argument('--agents', type=int, nargs='+', default=[10, 100, 500])
+    scale_parser.add_argument('--runs', type=int, default=3)
+    scale_parser.add_argument('--agent-latency', type=float, default=0.0)
+    scale_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    scale_parser.set_defaults(func=bench_scale)
+
+    overhead_parser = subparsers.add_parser('overhead', help='Measure graph orchestration overhead per request')
+    overhead_parser.add_argument('--runs', type=int, default=300)
+    overhead_parser.add_argument('--required-agents', type=int, default=1,
+                                 help='How many agents the stub selector keeps')
+    overhead_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    overhead_parser.set_defaults(func=bench_overhead)
+
+    semantic_parser = subparsers.add_parser('semantic-index', help='Compare exact and LSH answer cache lookups')
+    semantic_parser.add_argument('--entries', type=int, default=100_000)
+    semantic_parser.add_argument('--dimensions', type=int, default=256)
+    semantic_parser.add_argument('--lookups', type=int, default=200)
+    semantic_parser.add_argument('--noise', type=float, default=0.02, help='Per-dimension noise added to stored vectors')
+    semantic_parser.set_defaults(func=bench_semantic_index)
+
+    prefix_parser = subparsers.add_parser('prompt-prefix', help='Check prompts keep a byte-stable prefix for provider caching')
+    prefix_parser.set_defaults(func=bench_prompt_prefix)
+
+    transport_parser = subparsers.add_parser('transport', help='Compare pooled and unpooled agent calls against a local server')
+    transport_parser.add_argument('--calls', type=int, default=2000)
+    transport_parser.add_argument('--concurrency', type=int, default=32)
+    transport_parser.add_argument('--latency', type=float, default=0.0, help='Stand-in agent latency in seconds')
+    transport_parser.add_argument('--port', type=int, default=8090)
+    transport_parser.add_argument('--http2', action='store_true',
+                                  help='Serve the stand-in over HTTP/2 (needs hypercorn) and add a multiplexed run')
+    transport_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    transport_parser.set_defaults(func=bench_transport)
+
+    batching_parser = subparsers.add_parser('batching', help='Compare one request per agent call with batched requests')
+    batching_parser.add_argument('--calls', type=int, default=2000)
+    batching_parser.add_argument('--concurrency', type=int, default=64)
+    batching_parser.add_argument('--latency', type=float, default=0.02, help='Stand-in latency per request in seconds')
+    batching_parser.add_argument('--query-latency', type=float, default=0.001, help='Stand-in latency per query in seconds')
+    batching_parser.add_argument('--slots', type=int, default=4, help='Requests the stand-in serves at once')
+    batching_parser.add_argument('--window-ms', type=float, default=5.0)
+    batching_parser.add_argument('--max-batch', type=int, default=32)
+    batching_parser.add_argument('--port', type=int, default=8090)
+    batching_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    batching_parser.set_defaults(func=bench_batching)
+
+    replicas_parser = subparsers.add_parser('replicas', help='Compare balancing strategies across agent replicas')
+    replicas_parser.add_argument('--calls', type=int, default=1000)
+    replicas_parser.add_argument('--concurrency', type=int, default=32)
+    replicas_parser.add_argument('--replica-latency', type=float, nargs='+', default=[0.1, 0.1, 0.5],
+                                 help='Latency of each stand-in replica in seconds')
+    replicas_parser.add_argument('--slots', type=int, default=4, help='Requests each replica serves at once')
+    replicas_parser.add_argument('--port', type=int, default=8090)
+    replicas_parser.add_argument('--query', default='write some code that works with elizaos and goose')
+    replicas_parser.set_defaults(func=bench_replicas)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for cache and in-flight lookups: case and spacing are ignored"""
+    return " ".join(query.casefold().split()).rstrip("?.! ")
+
+class SingleFlight:
+    """Coalesces identical in-flight calls so only the first one does the work.
+
+    Later callers with the same key wait for the first call and share its result (or exception).
+    The key is forgotten as soon as the call finishes, so nothing is cached beyond its lifetime.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._futures: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn, or wait for the identical call already running in another thread"""
+        with self._lock:
+            self.calls += 1
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._futures[key] = future
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._futures[key]
+        return future.result()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of do.
+
+        The work runs in its own task, so one caller disconnecting does not cancel it for the others.
+        """
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+class CacheEntry(NamedTuple):
+    value: Any
+    expires_at: float  # time.time() after which the entry is stale
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+class MemoryStore:
+    """In-process store that evicts the least recently used entry beyond max_entries"""
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = CacheEntry(value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteStore:
+    """Store in a SQLite file, so entries survive restarts and are shared between processes.
+
+    Values must be JSON-serializable. Beyond max_entries, or max_bytes of encoded values when set,
+    the least recently used entries are evicted down to `low_watermark` of the limits, so the
+    eviction scan runs once per batch of writes rather than on every write. Entry count and size
+    are kept as running totals and re-read from the file only when they reach a limit.
+    """
+    blocking = True  # File I/O: async callers run its methods in a worker thread
+    TOUCH_INTERVAL = 60.0  # Seconds between access-time updates of an entry, to keep reads cheap
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "cache",
+        max_entries: int = 100_000,
+        max_bytes: Optional[int] = None,
+        low_watermark: float = 0.9
+    ):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+            self._count, self._bytes = self._totals()
+
+    def _totals(self) -> Tuple[int, int]:
+        count, size = self._connection.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        return count, size
+
+    def _size_of(self, key: str) -> Optional[int]:
+        row = self._connection.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT value, expires_at, accessed_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[2] > self.TOUCH_INTERVAL:
+                with self._connection:
+                    self._connection.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return CacheEntry(json.loads(row[0]), row[1])
+
+    def set(self, key: str, value: Any, expires_at: float):
+        encoded = json.dumps(value)
+        with self._lock, self._connection:
+            previous = self._size_of(key)
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), expires_at, time.time())
+            )
+            self._count += previous is None
+            self._bytes += len(encoded) - (previous or 0)
+            if self._over_limit():
+                self._evict()
+
+    def _over_limit(self) -> bool:
+        return self._count > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes)
+
+    def _evict(self):
+        # Other processes may have written to the file, so start from its real totals
+        self._count, self._bytes = self._totals()
+        if not self._over_limit():
+            return
+        target_count = int(self.max_entries * self.low_watermark)
+        target_bytes = int(self.max_bytes * self.low_watermark) if self.max_bytes is not None else None
+        # Walk the oldest entries through the accessed_at index until enough is freed
+        evicted = []
+        for key, size in self._connection.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at"):
+            if self._count <= target_count and (target_bytes is None or self._bytes <= target_bytes):
+                break
+            evicted.append((key,))
+            self._count -= 1
+            self._bytes -= size
+        self._connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", evicted)
+
+    def delete(self, key: str):
+        with self._lock, self._connection:
+            size = self._size_of(key)
+            if size is not None:
+                self._connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._count -= 1
+                self._bytes -= size
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute(f"DELETE FROM {self.table}")
+            self._count, self._bytes = 0, 0
+
+    def __len__(self) -> int:
+        return self._count
+
+async def run_store(store, fn: Callable, *args) -> Any:
+    """Call fn, in a worker thread when the store does blocking I/O, so the event loop keeps running"""
+    if getattr(store, "blocking", False):
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+class TTLCache:
+    """Exact-match cache with a time-to-live over a MemoryStore or SQLiteStore.
+
+    Counts hits and misses so the store can be sized from real traffic.
+    """
+    def __init__(self, store=None, ttl: float = 3600.0):
+        self.store = store if store is not None else MemoryStore()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.store.get(key)
+        if entry is None or not entry.fresh:
+            self.misses += 1
+            if entry is not None:
+                self.store.delete(key)
+            return None
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.store.set(key, value, time.time() + (self.ttl if ttl is None else ttl))
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.store)
+        }
+
+class AgentResponseCache:
+    """Cache of successful agent responses keyed by (agent, endpoint, normalized query).
+
+    Each agent can have its own TTL. Once an entry expires it is still served for up to
+    `stale_ttl` seconds while a background call refreshes it, so repeat queries never wait on
+    the agent. The default store is in memory; pass a SQLiteStore to keep responses across restarts.
+    """
+    def __init__(
+        self,
+        store=None,
+        ttl: float = 300.0,
+        agent_ttls: Optional[Dict[str, float]] = None,
+        stale_ttl: float = 3600.0
+    ):
+        self.store = store if store is not None else MemoryStore()
+        self.ttl = ttl
+        self.agent_ttls = {str(agent_id): agent_ttl for agent_id, agent_ttl in (agent_ttls or {}).items()}
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-cache-refresh")
+        self._tasks = set()
+
+    def _key(self, agent_id, endpoint: str, query: str) -> str:
+        return json.dumps([str(agent_id), endpoint, normalize_query(query)])
+
+    def _lookup(self, key: str) -> Tuple[Optional[dict], bool]:
+        """(cached response or None, whether it needs a background refresh)"""
+        entry = self.store.get(key)
+        if entry is not None and entry.fresh:
+            self.hits += 1
+            return entry.value, False
+        if entry is not None and time.time() < entry.expires_at + self.stale_ttl:
+            self.stale_hits += 1
+            with self._lock:
+                refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            return entry.value, refresh
+        self.misses += 1
+        return None, False
+
+    def _store(self, key: str, agent_id, result: dict):
+        if result.get("success"):
+            self.store.set(key, result, time.time() + self.agent_ttls.get(str(agent_id), self.ttl))
+
+    def _refreshed(self, key: str):
+        with self._lock:
+            self._refreshing.discard(key)
+            self.refreshes += 1
+
+    def call(self, agent_id, endpoint: str, query: str, fetch: Callable[[], dict]) -> dict:
+        """Cached response for the call, or fetch() it and cache a successful result"""
+        key = self._key(agent_id, endpoint, query)
+        cached, refresh = self._lookup(key)
+        if cached is None:
+            result = fetch()
+            self._store(key, agent_id, result)
+            return result
+        if refresh:
+            def revalidate():
+                try:
+                    self._store(key, agent_id, fetch())
+                finally:
+                    self._refreshed(key)
+            self._executor.submit(revalidate)
+        return cached
+
+    async def acall(self, agent_id, endpoint: str, query: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """Async version of call; refreshes run as tasks on the running loop"""
+        key = self._key(agent_id, endpoint, query)
+        cached, refresh = await run_store(self.store, self._lookup, key)
+        if cached is None:
+            result = await fetch()
+            await run_store(self.store, self._store, key, agent_id, result)
+            return result
+        if refresh:
+            async def revalidate():
+                try:
+                    await run_store(self.store, self._store, key, agent_id, await fetch())
+                finally:
+                    self._refreshed(key)
+            # Keep a reference so the refresh task is not garbage collected mid-flight
+            task = asyncio.ensure_future(revalidate())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return cached
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "size": len(self.store)
+        }
+
+class LLMResponseCache(BaseCache):
+    """Exact-match cache for chat model calls, keyed by model, parameters and the fully rendered prompt.
+
+    Pass it as `cache=` to a chat model and every call through that model is cached: chains,
+    output-fixing repairs and direct invokes alike. Wraps a TTLCache, so hits and misses are counted.
+    """
+    def __init__(self, store=None, ttl: float = 7 * 24 * 3600.0):
+        self.cache = TTLCache(store, ttl)
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        cached = self.cache.get(self._key(prompt, llm_string))
+        if cached is None:
+            return None
+        return [
+            ChatGeneration(message=messages_from_dict([generation["message"]])[0]) if "message" in generation
+            else Generation(text=generation["text"])
+            for generation in cached
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        # Stored as message dicts rather than pickles, so SQLite stores hold plain JSON
+        self.cache.set(self._key(prompt, llm_string), [
+            {"message": message_to_dict(generation.message)} if isinstance(generation, ChatGeneration)
+            else {"text": generation.text}
+            for generation in return_val
+        ])
+
+    # A SQLite store reads and writes a file, so its calls run in a worker thread; memory stores run inline
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return await run_store(self.cache.store, self.lookup, prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        await run_store(self.cache.store, self.update, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
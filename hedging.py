@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Optional
+
+from models import HedgingPolicy
+
+class LatencyTracker:
+    """Rolling window of recent call latencies"""
+    def __init__(self, window: int):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percentile: float, min_samples: int) -> Optional[float]:
+        """Latency at the percentile, or None until enough calls have been recorded"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < max(min_samples, 1):
+            return None
+        index = min(int(len(latencies) * percentile / 100), len(latencies) - 1)
+        return latencies[index]
+
+class Hedger:
+    """Fires a duplicate request when a call runs past the policy's latency percentile.
+
+    The first successful answer wins and the loser is cancelled (async) or discarded (sync).
+    Hedges are limited to `policy.budget` of all calls so they cannot amplify an overload.
+    """
+    def __init__(self, policy: HedgingPolicy):
+        self.policy = policy
+        self.latencies = LatencyTracker(policy.window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        # Sync primaries run here so they can be timed; size it well above expected concurrency
+        self._executor = ThreadPoolExecutor(max_workers=256, thread_name_prefix="hedger")
+
+    def _start_call(self) -> Optional[float]:
+        """Count a call and return how long to wait before hedging it, if at all"""
+        with self._lock:
+            self.calls += 1
+        return self.latencies.percentile(self.policy.percentile, self.policy.min_samples)
+
+    def _acquire_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.policy.budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _finish(self, started_at: float, result: dict, hedged: bool) -> dict:
+        if result["success"]:
+            self.latencies.record(time.monotonic() - started_at)
+        if hedged:
+            with self._lock:
+                self.hedge_wins += 1
+        return result
+
+    def call(self, primary: Callable[[], dict], hedge: Callable[[], dict]) -> dict:
+        """Run primary, hedging with a second call if it is slow"""
+        started_at = time.monotonic()
+        delay = self._start_call()
+        if delay is None:
+            return self._finish(started_at, primary(), hedged=False)
+
+        first = self._executor.submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._acquire_hedge():
+            return self._finish(started_at, first.result(), hedged=False)
+
+        hedge_started_at = time.monotonic()
+        second = self._executor.submit(hedge)
+        done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        # A fast failure should not beat a call that may still succeed
+        if not winner.result()["success"] and pending:
+            winner = pending.pop()
+        for future in (first, second):
+            if future is not winner:
+                future.cancel()
+        if winner is second:
+            return self._finish(hedge_started_at, winner.result(), hedged=True)
+        return self._finish(started_at, winner.result(), hedged=False)
+
+    async def acall(self, primary: Callable[[], Awaitable[dict]], hedge: Callable[[], Awaitable[dict]]) -> dict:
+        """Async version of call; the losing request is cancelled"""
+        started_at = time.monotonic()
+        delay = self._start_call()
+        if delay is None:
+            return self._finish(started_at, await primary(), hedged=False)
+
+        first = asyncio.ensure_future(primary())
+        second = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or not self._acquire_hedge():
+                return self._finish(started_at, await first, hedged=False)
+
+            hedge_started_at = time.monotonic()
+            second = asyncio.ensure_future(hedge())
+            done, pending = await asyncio.wait({first, second}, return_when=asyncio.FIRST_COMPLETED)
+            winner = done.pop()
+            if not winner.result()["success"] and pending:
+                winner = pending.pop()
+                await asyncio.wait({winner})
+            if winner is second:
+                return self._finish(hedge_started_at, winner.result(), hedged=True)
+            return self._finish(started_at, winner.result(), hedged=False)
+        finally:
+            for call in (first, second):
+                if call is not None and not call.done():
+                    call.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
@@ -0,0 +1,162 @@
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser, JsonOutputParser
+from pydantic import BaseModel, PrivateAttr, ValidationError
+
+def strip_code_fences(text: str) -> str:
+    match = re.search(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", text, re.DOTALL)
+    return match.group(1) if match else text
+
+def strip_extra_prose(text: str) -> str:
+    """Keep the span from the first opening brace to the last closing one (or the end, if truncated)"""
+    start = text.find("{")
+    if start == -1:
+        return text
+    end = text.rfind("}")
+    return text[start:end + 1] if end > start else text[start:]
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+def _quoted_end(text: str, start: int) -> int:
+    """Index just past the string opened at text[start], or len(text) if it is never closed"""
+    quote, index = text[start], start + 1
+    while index < len(text) and text[index] != quote:
+        index += 2 if text[index] == "\\" else 1
+    return min(index + 1, len(text))
+
+def fix_quotes(text: str) -> str:
+    """Python-style output: single-quoted strings and True/False/None literals.
+
+    Only text outside double-quoted strings is touched, so apostrophes in valid strings survive.
+    """
+    pieces = []
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char in "\"'":
+            end = _quoted_end(text, index)
+            piece = text[index:end]
+            if char == "'":
+                closed = len(piece) > 1 and piece.endswith("'")
+                body = piece[1:-1] if closed else piece[1:]
+                body = re.sub(r"\\'", "'", body).replace('"', '\\"')
+                piece = '"' + body + ('"' if closed else "")
+            pieces.append(piece)
+            index = end
+        else:
+            end = min((position for position in (text.find('"', index), text.find("'", index)) if position != -1),
+                      default=len(text))
+            pieces.append(re.sub(r"\b(True|False|None)\b", lambda m: PYTHON_LITERALS[m.group(1)], text[index:end]))
+            index = end
+    return "".join(pieces)
+
+def strip_trailing_commas(text: str) -> str:
+    """Drop commas right before a closing bracket, leaving the contents of strings alone"""
+    pieces = []
+    index = 0
+    while index < len(text):
+        if text[index] == '"':
+            end = _quoted_end(text, index)
+            pieces.append(text[index:end])
+        else:
+            end = text.find('"', index)
+            end = len(text) if end == -1 else end
+            pieces.append(re.sub(r",\s*([}\]])", r"\1", text[index:end]))
+        index = end
+    return "".join(pieces)
+
+def close_truncated(text: str) -> str:
+    """Cut a truncated document back to its last complete value and close the open brackets"""
+    stack: List[str] = []
+    in_string = escaped = False
+    last_complete: Optional[Tuple[int, List[str]]] = None
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+            last_complete = (index + 1, list(stack))
+    if not stack and not in_string:
+        return text
+    if last_complete is None:
+        return text
+    end, open_brackets = last_complete
+    return strip_trailing_commas(text[:end].rstrip().rstrip(",") + "".join(reversed(open_brackets)))
+
+# Applied cumulatively in this order until the text parses and validates
+REPAIRS: List[Tuple[str, Callable[[str], str]]] = [
+    ("code_fence", strip_code_fences),
+    ("extra_prose", strip_extra_prose),
+    ("single_quotes", fix_quotes),
+    ("trailing_commas", strip_trailing_commas),
+    ("truncated", close_truncated),
+]
+
+def repair_json(text: str, validate: Callable[[Any], Any]) -> Tuple[Any, List[str]]:
+    """Parse and validate text, applying local repairs as needed; returns (value, names of repairs used).
+
+    Raises OutputParserException when no combination of repairs yields a valid document.
+    """
+    applied: List[str] = []
+    error: Optional[Exception] = None
+    for name, repair in [("clean", lambda text: text)] + REPAIRS:
+        repaired = repair(text)
+        if repaired == text and name != "clean":
+            continue
+        if name != "clean":
+            applied.append(name)
+        text = repaired
+        try:
+            return validate(json.loads(text)), applied
+        except (json.JSONDecodeError, ValidationError, TypeError) as e:
+            error = e
+    raise OutputParserException(f"Could not repair output locally: {error}", llm_output=text)
+
+class RepairingJsonParser(BaseOutputParser[dict]):
+    """JSON parser that fixes common LLM formatting mistakes locally and validates against a schema.
+
+    Meant to sit inside OutputFixingParser, so the LLM repair call only happens when local repair fails.
+    stats() reports "clean" parses, each local repair used, and "unrepaired" outputs left for the LLM.
+    """
+    pydantic_object: Type[BaseModel]
+    _counts: Counter = PrivateAttr(default_factory=Counter)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _validate(self, value: Any) -> dict:
+        return self.pydantic_object.model_validate(value).model_dump()
+
+    def parse(self, text: str) -> dict:
+        try:
+            value, applied = repair_json(text, self._validate)
+        except OutputParserException:
+            with self._lock:
+                self._counts["unrepaired"] += 1
+            raise
+        with self._lock:
+            self._counts.update(applied or ["clean"])
+        return value
+
+    def get_format_instructions(self) -> str:
+        return JsonOutputParser(pydantic_object=self.pydantic_object).get_format_instructions()
+
+    @property
+    def _type(self) -> str:
+        return "repairing_json"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
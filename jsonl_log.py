@@ -0,0 +1,57 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from functools import lru_cache
+from typing import List
+
+class JsonlLog:
+    """Appends JSON records to a file from a background thread, so callers never wait on disk I/O.
+
+    The file is rotated once it reaches `max_bytes`, keeping `backups` older files next to it
+    (path.1 is the most recent), so a long-running server does not fill the disk.
+    """
+    def __init__(self, path: str, max_bytes: int = 16 * 1024 * 1024, backups: int = 3):
+        self.path = path
+        self.backups = backups
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler)
+        self._listener.start()
+        self._closed = False
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, record: dict):
+        self._listener.queue.put_nowait(logging.makeLogRecord({"msg": json.dumps(record)}))
+
+    def close(self):
+        """Write out queued records and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+
+@lru_cache(maxsize=None)
+def jsonl_log(path: str) -> JsonlLog:
+    """Shared log per file, so every writer goes through one thread and rotation stays consistent"""
+    return JsonlLog(path)
+
+def read_jsonl(path: str, backups: int = 3) -> List[dict]:
+    """Records of a log and its rotated backups, oldest first"""
+    paths = [f"{path}.{index}" for index in range(backups, 0, -1)] + [path]
+    records = []
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, encoding="utf-8") as log:
+            records.extend(json.loads(line) for line in log if line.strip())
+    return records
@@ -1,18 +1,51 @@
+import asyncio
 import os
-from typing import List, Dict, Set
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Optional, Set, Tuple
 
 # Core LangChain and LangGraph imports
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableLambda
 from langchain.output_parsers import OutputFixingParser
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph
 from langchain_deepseek import ChatDeepSeek
 
 # Local Imports
-from agents import ElizaOSAgent, TronAgent, GooseAgent
-from models import AgentRequirements, AgentTask, AgentType, ManagerState, TaskStatus
+from agents import BaseAgent, default_framework_agents
+from batching import AgentBatcher
+from cache import AgentResponseCache, LLMResponseCache, SQLiteStore, SingleFlight, TTLCache, normalize_query, run_store
+from hedging import Hedger
+from json_repair import RepairingJsonParser
+from prompt_cache import PromptCacheStats
+from router import LocalRouter, default_routing_policy
+from semantic_cache import SemanticCache
+from streaming import ChunkListener, PartialResponses
+from tiering import TierDecision, TierLog, score_complexity
+from token_budget import PackingReport, pack_responses, token_counter
+from models import (
+    AgentId,
+    AggregationPolicy,
+    AggregationStrategy,
+    BatchingPolicy,
+    AgentRequirements,
+    AgentTask,
+    AgentType,
+    CompletionPolicy,
+    ExecutionMode,
+    HedgingPolicy,
+    ManagerState,
+    RoutingPolicy,
+    TaskLedger,
+    TaskStatus,
+    TokenBudget,
+    merge_tasks
+)
 
 # For development/testing: Simulate API responses
 def simulate_api_response(agent_type: AgentType, query: str) -> dict:
@@ -24,15 +57,71 @@ def simulate_api_response(agent_type: AgentType, query: str) -> dict:
     }
     return {"success": True, "result": responses[agent_type]}
 
+def timed_out_result(partial_response: Optional[str] = None) -> dict:
+    """Result recorded for an agent that was still running when the completion policy was satisfied"""
+    result = {"success": False, "error": "Agent did not respond before the completion policy was satisfied", "timed_out": True}
+    if partial_response:
+        result["partial_response"] = partial_response
+    return result
+
+def record_result(task: AgentTask, result: dict) -> AgentTask:
+    """Return a copy of the task updated with the agent's result"""
+    if result["success"]:
+        return task.model_copy(update={"response": result["result"], "status": TaskStatus.COMPLETED})
+    status = TaskStatus.TIMED_OUT if result.get("timed_out") else TaskStatus.FAILED
+    return task.model_copy(update={
+        "error": result["error"],
+        "status": status,
+        "partial_response": result.get("partial_response")
+    })
+
 # Manager Agent Implementation
 class FrameworkManagerAgent:
-    def __init__(self, llm: BaseChatModel):
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        selector_llm: Optional[BaseChatModel] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        framework_agents: Optional[Dict[AgentId, BaseAgent]] = None,
+        max_concurrency: int = 64,
+        selection_cache: Optional[TTLCache] = None,
+        routing: Optional[RoutingPolicy] = None,
+        response_cache: Optional[AgentResponseCache] = None,
+        aggregation: Optional[AggregationPolicy] = None,
+        token_budget: Optional[TokenBudget] = None,
+        batching: Optional[BatchingPolicy] = None
+    ):
         self.llm = llm
-        self.framework_agents = {
-            AgentType.ELIZAOS: ElizaOSAgent(),
-            AgentType.TRON: TronAgent(),
-            AgentType.GOOSE: GooseAgent()
+        self.selector_llm = selector_llm if selector_llm is not None else ChatDeepSeek(model="deepseek-chat")
+        self.framework_agents = framework_agents if framework_agents is not None else default_framework_agents()
+        # Upper bound on agent calls one request runs at once, for registries with many agents
+        self.max_concurrency = max_concurrency
+        # Each agent keeps its own latency history, so hedging is off unless a policy is given
+        self.hedgers = {agent_type: Hedger(hedging) for agent_type in self.framework_agents} if hedging else {}
+        # Calls to agents with a batch endpoint are sent together, across concurrent requests
+        self.batchers = {
+            agent_type: AgentBatcher(agent, batching)
+            for agent_type, agent in self.framework_agents.items()
+            if batching and agent.batch_endpoint
         }
+        # Selector decisions keyed by normalized query; None calls the selector every time
+        self.selection_cache = selection_cache
+        # Keyword rules and a local classifier that answer selection without the LLM when confident
+        self.router = LocalRouter(self.framework_agents, routing) if routing else None
+        # Agent responses reused across requests; None posts every query to the agent
+        self.response_cache = response_cache
+        self.aggregation = aggregation or AggregationPolicy()
+        self.tier_log = TierLog(self.aggregation.tier_log) if self.aggregation.tier_log else None
+        self.aggregations = Counter()  # Requests finalized with each strategy
+        self.token_budget = token_budget or TokenBudget()
+        # Loaded here rather than on the first aggregation: tiktoken may download the encoding,
+        # which must not happen inside a request on the event loop
+        self.token_counter = token_counter(self.token_budget.encoding)
+        self.tokens_saved = 0  # Across all requests
+        
+        # Prompts put every fixed instruction in a byte-stable system message and the per-request
+        # content last, so the provider's prefix cache covers all of the instructions
+        # (see prompt_cache.check_prompt_prefixes)
         
         # Prompt for determining which agents are needed
         self.agent_selector_prompt = ChatPromptTemplate.from_messages([
@@ -40,9 +129,7 @@ class FrameworkManagerAgent:
             framework agents need to be consulted to answer a query comprehensively.
             
             Available framework agents:
-            - elizaos: Specializes in the ElizaOS framework, which excels at AI-driven operating systems, file system operations, and pattern matching
-            - tron: Specializes in the Tron framework, which focuses on grid-based algorithms, lightweight memory management, and real-time processing
-            - goose: Specializes in the Goose framework, which is known for distributed processing, fault tolerance, and scalable solutions
+            {available_agents}
             
             For each agent, determine if it's needed to fully answer the query. Consider the query carefully - some queries might require multiple frameworks, while others might only need one specific framework.
             
@@ -50,7 +137,11 @@ class FrameworkManagerAgent:
             - Whether it's needed (true/false)
             - A clear reason explaining why it is or isn't needed"""),
             ("human", "Query: {query}")
-        ])
+        ]).partial(available_agents="\n            ".join(
+            # Sorted, so the listing does not depend on registration order
+            f"- {agent_id}: {self.framework_agents[agent_id].description}"
+            for agent_id in sorted(self.framework_agents, key=str)
+        ))
         
         # Prompt for aggregating responses
         self.response_aggregator_prompt = ChatPromptTemplate.from_messages([
@@ -63,82 +154,502 @@ class FrameworkManagerAgent:
             2. Highlight the strengths of each framework for the specific parts of the solution
             3. Provide a unified recommendation that incorporates the best elements from each framework
             4. Ensure there are no contradictions in the final response
-            5. Use a clear structure that flows naturally between different framework insights"""),
-            ("human", """Original query: {query}
-            
-            Framework agent responses:
-            {agent_responses}
+            5. Use a clear structure that flows naturally between different framework insights
             
             Please create a comprehensive response that addresses the original query by synthesizing these insights. Do not talk about the context provided, 
-            but instead just use it to answer the question naturally.
-            """)
+            but instead just use it to answer the question naturally."""),
+            ("human", "Original query: {query}\n\nFramework agent responses:\n{agent_responses}")
         ])
+        
+        # Prefix cache hits DeepSeek reports for every selector, repair and aggregator call
+        self.prompt_cache_stats = PromptCacheStats()
+        
+        # Chains hold no per-request state, so they are built once and shared by every request
+        tracked = {"callbacks": [self.prompt_cache_stats]}
+        self.agent_selector_chain = self._agent_selector_chain().with_config(tracked)
+        self.response_aggregator_chain = (self.response_aggregator_prompt | self.llm).with_config(tracked)
+        self.fast_aggregator_chain = (self.response_aggregator_prompt | self.selector_llm).with_config(tracked)
     
-    def determine_required_agents(self, query: str) -> Set[AgentType]:
-        """Determine which agents are needed to answer the query"""
-        # Create base JSON parser
-        base_parser = JsonOutputParser(pydantic_object=AgentRequirements)
-        chat_llm = ChatDeepSeek(model="deepseek-chat")
+    def _agent_selector_chain(self):
+        """Build the selector chain: prompt -> deepseek-chat -> JSON parser with local, then LLM, repair"""
+        # Base JSON parser that repairs common formatting mistakes locally and validates the schema
+        self.selector_parser = RepairingJsonParser(pydantic_object=AgentRequirements)
         
-        # Wrap with fixing parser that can handle invalid JSON
+        # Wrap with fixing parser that asks the LLM to fix what local repair could not
         parser = OutputFixingParser.from_llm(
-            parser=base_parser,
-            llm=chat_llm
+            parser=self.selector_parser,
+            llm=self.selector_llm
         )
         
-        chain = self.agent_selector_prompt | chat_llm | parser
-        
+        return self.agent_selector_prompt | self.selector_llm | parser
+    
+    def _required_agents_from_result(self, result: dict) -> Set[AgentId]:
+        """Extract the needed agents from the parsed AgentRequirements output"""
+        # Access agents using dictionary notation
+        agents_list = result['agents']
+        # Extract the required agents using dictionary notation
+        required_agents = {
+            agent['agent_type'] for agent in agents_list
+            if agent['needed'] and agent['agent_type'] in self.framework_agents
+        }
+        if not required_agents:  # Check if required_agents is empty
+            return set(self.framework_agents.keys())  # Return all agents
+        return required_agents
+    
+    def _registry_agents(self, cached: Optional[List[str]]) -> Optional[Set[AgentId]]:
+        """Map a cached selector decision back to registry keys"""
+        if cached is None:
+            return None
+        # Ids are cached as strings so disk stores can hold them
+        return {agent_id for agent_id in self.framework_agents if str(agent_id) in cached}
+    
+    def _cached_required_agents(self, query: str) -> Optional[Set[AgentId]]:
+        """Selector decision cached for the query, if any"""
+        if self.selection_cache is None:
+            return None
+        return self._registry_agents(self.selection_cache.get(normalize_query(query)))
+    
+    async def _acached_required_agents(self, query: str) -> Optional[Set[AgentId]]:
+        """Async version of _cached_required_agents; disk stores are read off the event loop"""
+        if self.selection_cache is None:
+            return None
+        cached = await run_store(self.selection_cache.store, self.selection_cache.get, normalize_query(query))
+        return self._registry_agents(cached)
+    
+    def _local_required_agents(self, query: str, cached: Optional[Set[AgentId]]) -> Optional[Set[AgentId]]:
+        """Selection answered without the LLM selector: the cached decision or a confident local route"""
+        if cached:
+            return cached
+        if self.router is not None:
+            return self.router.route(query)
+        return None
+    
+    def _record_required_agents(self, query: str, required_agents: Set[AgentId], elapsed: float):
+        """Keep an LLM selector decision in the selection cache and the router's decision log"""
+        if self.selection_cache is not None:
+            self.selection_cache.set(normalize_query(query), sorted(str(agent_id) for agent_id in required_agents))
+        if self.router is not None:
+            self.router.record(query, required_agents, elapsed * 1000)
+    
+    async def _arecord_required_agents(self, query: str, required_agents: Set[AgentId], elapsed: float):
+        """Async version of _record_required_agents; disk stores are written off the event loop"""
+        if self.selection_cache is not None:
+            await run_store(
+                self.selection_cache.store, self.selection_cache.set,
+                normalize_query(query), sorted(str(agent_id) for agent_id in required_agents)
+            )
+        if self.router is not None:
+            self.router.record(query, required_agents, elapsed * 1000)
+    
+    def determine_required_agents(self, query: str) -> Set[AgentId]:
+        """Determine which agents are needed to answer the query"""
+        local = self._local_required_agents(query, self._cached_required_agents(query))
+        if local:
+            return local
         try:
-            result = chain.invoke({"query": query})
-            # Access agents using dictionary notation
-            agents_list = result['agents']
-            # Extract the required agents using dictionary notation
-            required_agents = {agent['agent_type'] for agent in agents_list if agent['needed']}
-            if not required_agents:  # Check if required_agents is empty
-                return set(self.framework_agents.keys())  # Return all agents
-            return required_agents
+            start = time.perf_counter()
+            result = self.agent_selector_chain.invoke({"query": query})
+            required_agents = self._required_agents_from_result(result)
         except Exception as e:
             # Fallback if parsing still fails
             print(f"Warning: Failed to parse agent requirements: {e}")
-            # Return all agents as a fallback
-            return set(AgentType)
+            # Return all agents as a fallback, without caching it
+            return set(self.framework_agents.keys())
+        self._record_required_agents(query, required_agents, time.perf_counter() - start)
+        return required_agents
+    
+    async def adetermine_required_agents(self, query: str) -> Set[AgentId]:
+        """Async version of determine_required_agents"""
+        local = self._local_required_agents(query, await self._acached_required_agents(query))
+        if local:
+            return local
+        try:
+            start = time.perf_counter()
+            result = await self.agent_selector_chain.ainvoke({"query": query})
+            required_agents = self._required_agents_from_result(result)
+        except Exception as e:
+            print(f"Warning: Failed to parse agent requirements: {e}")
+            return set(self.framework_agents.keys())
+        await self._arecord_required_agents(query, required_agents, time.perf_counter() - start)
+        return required_agents
     
-    def process_with_agent(self, agent_type: AgentType, query: str) -> dict:
-        """Process the query with the specified agent"""
+    def process_with_agent(self, agent_type: AgentId, query: str, on_chunk: Optional[Callable[[str], None]] = None) -> dict:
+        """Process the query with the specified agent; a streaming agent passes its text to on_chunk as it arrives"""
         # For real implementation, use actual API calls
-        return self.framework_agents[agent_type].process(query)
+        agent = self.framework_agents[agent_type]
+        hedger = self.hedgers.get(agent_type)
+        batcher = self.batchers.get(agent_type)
+        
+        def primary(endpoint: Optional[str] = None) -> dict:
+            # Batched calls come back whole, so only unbatched ones stream
+            return batcher.call(query) if batcher else agent.process(query, endpoint, on_chunk)
+        
+        def call() -> dict:
+            if hedger is None:
+                return primary()
+            # Only the primary streams, so a hedge does not interleave its text with it,
+            # and the hedge goes to a different replica when the agent has more than one
+            endpoint = agent.pick_endpoint()
+            return hedger.call(lambda: primary(endpoint), lambda: agent.process(query, agent.hedge_target(endpoint)))
+        
+        if self.response_cache is None:
+            return call()
+        return self.response_cache.call(agent_type, agent.api_endpoint, query, call)
         
         # For testing/development, use simulated responses
         # return simulate_api_response(agent_type, query)
     
-    def aggregate_responses(self, query: str, completed_tasks: List[AgentTask]) -> str:
-        """Combine responses from all agents into a cohesive answer"""
-        # Format the agent responses for the prompt
-        agent_responses = "\n\n".join([
+    async def aprocess_with_agent(self, agent_type: AgentId, query: str, on_chunk: Optional[Callable[[str], None]] = None) -> dict:
+        """Async version of process_with_agent"""
+        agent = self.framework_agents[agent_type]
+        hedger = self.hedgers.get(agent_type)
+        batcher = self.batchers.get(agent_type)
+        
+        async def primary(endpoint: Optional[str] = None) -> dict:
+            return await (batcher.acall(query) if batcher else agent.aprocess(query, endpoint, on_chunk))
+        
+        async def call() -> dict:
+            if hedger is None:
+                return await primary()
+            endpoint = agent.pick_endpoint()
+            return await hedger.acall(lambda: primary(endpoint), lambda: agent.aprocess(query, agent.hedge_target(endpoint)))
+        
+        if self.response_cache is None:
+            return await call()
+        return await self.response_cache.acall(agent_type, agent.api_endpoint, query, call)
+    
+    def _wait_for_results(
+        self,
+        futures: Dict[AgentId, Future],
+        policy: CompletionPolicy,
+        started_at: float,
+        completed: int = 0,
+        partials: Optional[PartialResponses] = None
+    ) -> Dict[AgentId, dict]:
+        """Collect agent results until all calls finish or the policy is satisfied.
+        
+        `completed` counts agents the request has already completed, towards the policy quorum.
+        Calls still running at that point are cancelled if not yet started and get a timed out result,
+        keeping any text they had streamed into `partials`.
+        """
+        results = {}
+        agent_types = {future: agent_type for agent_type, future in futures.items()}
+        try:
+            if not policy.is_satisfied(completed, started_at):
+                for future in as_completed(agent_types, timeout=policy.remaining(started_at)):
+                    result = future.result()
+                    results[agent_types[future]] = result
+                    completed += result["success"]
+                    if policy.is_satisfied(completed, started_at):
+                        break
+        except TimeoutError:
+            pass
+        
+        for agent_type, future in futures.items():
+            if agent_type not in results:
+                future.cancel()
+                results[agent_type] = timed_out_result(partials and partials.get(agent_type))
+        if partials is not None:
+            partials.close()
+        return results
+    
+    async def _await_results(
+        self,
+        calls: Dict[AgentId, asyncio.Task],
+        policy: CompletionPolicy,
+        started_at: float,
+        completed: int = 0,
+        partials: Optional[PartialResponses] = None
+    ) -> Dict[AgentId, dict]:
+        """Async version of _wait_for_results; calls still running are cancelled"""
+        results = {}
+        pending = {call: agent_type for agent_type, call in calls.items()}
+        try:
+            while pending and not policy.is_satisfied(completed, started_at):
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=policy.remaining(started_at),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for call in done:
+                    result = call.result()
+                    results[pending.pop(call)] = result
+                    completed += result["success"]
+        finally:
+            for call, agent_type in pending.items():
+                call.cancel()
+                results[agent_type] = timed_out_result(partials and partials.get(agent_type))
+            if partials is not None:
+                partials.close()
+        return results
+    
+    def process_tasks(
+        self,
+        tasks: List[AgentTask],
+        policy: CompletionPolicy,
+        started_at: float,
+        completed: int = 0,
+        on_chunk: Optional[ChunkListener] = None
+    ) -> List[AgentTask]:
+        """Process the tasks concurrently and return them updated.
+        
+        Tasks still running once the policy is satisfied are marked as timed out; their
+        threads cannot be interrupted, so those results are discarded when they arrive.
+        Streaming agents report each piece of text to on_chunk as it arrives.
+        """
+        if not tasks:
+            return []
+        partials = PartialResponses(on_chunk)
+        if len(tasks) == 1 and policy.deadline_ms is None and not policy.is_satisfied(completed, started_at):
+            # Nothing to race against, so skip the thread pool
+            task = tasks[0]
+            result = self.process_with_agent(task.agent_type, task.query, partials.handler(task.agent_type))
+            return [record_result(task, result)]
+        executor = ThreadPoolExecutor(max_workers=max(min(len(tasks), self.max_concurrency), 1))
+        try:
+            futures = {
+                task.agent_type: executor.submit(
+                    self.process_with_agent, task.agent_type, task.query, partials.handler(task.agent_type)
+                )
+                for task in tasks
+            }
+            results = self._wait_for_results(futures, policy, started_at, completed, partials)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return [record_result(task, results[task.agent_type]) for task in tasks]
+    
+    async def aprocess_tasks(
+        self,
+        tasks: List[AgentTask],
+        policy: CompletionPolicy,
+        started_at: float,
+        completed: int = 0,
+        on_chunk: Optional[ChunkListener] = None
+    ) -> List[AgentTask]:
+        """Async version of process_tasks; calls still running are cancelled"""
+        if not tasks:
+            return []
+        partials = PartialResponses(on_chunk)
+        if len(tasks) == 1 and policy.deadline_ms is None and not policy.is_satisfied(completed, started_at):
+            task = tasks[0]
+            result = await self.aprocess_with_agent(task.agent_type, task.query, partials.handler(task.agent_type))
+            return [record_result(task, result)]
+        slots = asyncio.Semaphore(self.max_concurrency)
+        
+        async def bounded_call(task: AgentTask) -> dict:
+            async with slots:
+                return await self.aprocess_with_agent(task.agent_type, task.query, partials.handler(task.agent_type))
+        
+        calls = {task.agent_type: asyncio.create_task(bounded_call(task)) for task in tasks}
+        results = await self._await_results(calls, policy, started_at, completed, partials)
+        return [record_result(task, results[task.agent_type]) for task in tasks]
+    
+    def predict_required_agents(self, query: str) -> Set[AgentId]:
+        """Agents to start speculatively while the selector runs (all of them unless overridden)"""
+        return set(self.framework_agents.keys())
+    
+    def speculative_process(
+        self,
+        query: str,
+        policy: CompletionPolicy,
+        started_at: float,
+        on_chunk: Optional[ChunkListener] = None,
+        log: Callable[..., None] = print
+    ) -> Tuple[Set[AgentId], Dict[AgentId, dict]]:
+        """Run the selector while the predicted agents are already processing the query.
+        
+        Returns the required agents and the results of those that were speculated.
+        Calls to agents the selector rejects are cancelled if not yet started, otherwise discarded,
+        and reported through `log`.
+        """
+        speculated = self.predict_required_agents(query)
+        partials = PartialResponses(on_chunk)
+        executor = ThreadPoolExecutor(max_workers=max(min(len(speculated), self.max_concurrency), 1))
+        try:
+            futures = {
+                agent_type: executor.submit(self.process_with_agent, agent_type, query, partials.handler(agent_type))
+                for agent_type in speculated
+            }
+            required_agents = self.determine_required_agents(query)
+            for agent_type in speculated - required_agents:
+                futures[agent_type].cancel()
+            selected = {
+                agent_type: future
+                for agent_type, future in futures.items()
+                if agent_type in required_agents
+            }
+            results = self._wait_for_results(selected, policy, started_at, partials=partials)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        log(f"[Speculative] Discarded agents: {sorted(str(agent_type) for agent_type in speculated - required_agents)}")
+        return required_agents, results
+    
+    async def aspeculative_process(
+        self,
+        query: str,
+        policy: CompletionPolicy,
+        started_at: float,
+        on_chunk: Optional[ChunkListener] = None,
+        log: Callable[..., None] = print
+    ) -> Tuple[Set[AgentId], Dict[AgentId, dict]]:
+        """Async version of speculative_process; rejected agent calls are cancelled outright"""
+        speculated = self.predict_required_agents(query)
+        partials = PartialResponses(on_chunk)
+        pending = {
+            agent_type: asyncio.create_task(self.aprocess_with_agent(agent_type, query, partials.handler(agent_type)))
+            for agent_type in speculated
+        }
+        try:
+            required_agents = await self.adetermine_required_agents(query)
+        except BaseException:
+            for call in pending.values():
+                call.cancel()
+            raise
+        for agent_type in speculated - required_agents:
+            pending[agent_type].cancel()
+        
+        selected = {
+            agent_type: call
+            for agent_type, call in pending.items()
+            if agent_type in required_agents
+        }
+        results = await self._await_results(selected, policy, started_at, partials=partials)
+        log(f"[Speculative] Discarded agents: {sorted(str(agent_type) for agent_type in speculated - required_agents)}")
+        return required_agents, results
+    
+    def _format_agent_responses(self, completed_tasks: List[AgentTask]) -> str:
+        """Format the agent responses for the aggregator prompt"""
+        return "\n\n".join([
             f"{task.agent_type.upper()} AGENT:\n{task.response}"
             for task in completed_tasks
             if task.status == TaskStatus.COMPLETED
         ])
+    
+    def choose_aggregation(
+        self,
+        query: str,
+        completed_tasks: List[AgentTask],
+        policy: Optional[CompletionPolicy] = None,
+        started_at: Optional[float] = None
+    ) -> TierDecision:
+        """Pick the aggregation strategy, and so the synthesis model, for the request"""
+        decision = self._choose_aggregation(query, completed_tasks, policy or CompletionPolicy(), started_at)
+        if self.tier_log is not None:
+            self.tier_log.record(query, decision)
+        return decision
+    
+    def _choose_aggregation(
+        self,
+        query: str,
+        completed_tasks: List[AgentTask],
+        policy: CompletionPolicy,
+        started_at: Optional[float]
+    ) -> TierDecision:
+        responses = [task.response or "" for task in completed_tasks if task.status == TaskStatus.COMPLETED]
+        if len(responses) <= 1:
+            return TierDecision(AggregationStrategy.PASSTHROUGH, "single_response")
+        if policy.aggregation is not None:
+            # Passthrough only applies to a single response
+            if policy.aggregation == AggregationStrategy.PASSTHROUGH:
+                return TierDecision(AggregationStrategy.TEMPLATE, "override")
+            return TierDecision(policy.aggregation, "override")
         
-        chain = self.response_aggregator_prompt | self.llm
+        remaining = policy.budget_remaining(started_at) if started_at is not None else None
+        if remaining is not None and remaining * 1000 < self.aggregation.fast_ms:
+            return TierDecision(AggregationStrategy.TEMPLATE, "budget")
+        complexity = score_complexity(query, responses)
+        if complexity.score < self.aggregation.reasoner_min_score:
+            return TierDecision(AggregationStrategy.FAST, "complexity", complexity)
+        if remaining is not None and remaining * 1000 < self.aggregation.reasoner_ms:
+            return TierDecision(AggregationStrategy.FAST, "budget", complexity)
+        return TierDecision(AggregationStrategy.REASONER, "complexity", complexity)
+    
+    def pack_responses(self, completed_tasks: List[AgentTask]) -> Tuple[List[AgentTask], PackingReport]:
+        """Compact or trim the responses to fit the aggregator token budget"""
+        packed, report = pack_responses(
+            completed_tasks, self.token_budget.max_tokens, self.token_counter
+        )
+        self.tokens_saved += report.tokens_saved
+        return packed, report
+    
+    def _merge_template(self, completed_tasks: List[AgentTask]) -> str:
+        """Responses under per-agent headings, for when there is no time for a synthesis call"""
+        return "\n\n".join(
+            f"## {str(task.agent_type).upper()}\n\n{task.response}"
+            for task in completed_tasks
+            if task.status == TaskStatus.COMPLETED
+        )
+    
+    def _local_aggregation(self, completed_tasks: List[AgentTask], strategy: AggregationStrategy) -> Optional[str]:
+        """Output of the strategies that need no LLM call, or None for synthesis strategies"""
+        self.aggregations[strategy] += 1
+        if strategy == AggregationStrategy.PASSTHROUGH:
+            return next((task.response for task in completed_tasks if task.status == TaskStatus.COMPLETED), "")
+        if strategy == AggregationStrategy.TEMPLATE:
+            return self._merge_template(completed_tasks)
+        return None
+    
+    def aggregate_responses(
+        self,
+        query: str,
+        completed_tasks: List[AgentTask],
+        strategy: AggregationStrategy = AggregationStrategy.REASONER
+    ) -> str:
+        """Combine responses from all agents into a cohesive answer"""
+        output = self._local_aggregation(completed_tasks, strategy)
+        if output is not None:
+            return output
+        chain = self.fast_aggregator_chain if strategy == AggregationStrategy.FAST else self.response_aggregator_chain
         result = chain.invoke({
             "query": query,
-            "agent_responses": agent_responses
+            "agent_responses": self._format_agent_responses(completed_tasks)
+        })
+        
+        return result.content
+    
+    async def aaggregate_responses(
+        self,
+        query: str,
+        completed_tasks: List[AgentTask],
+        strategy: AggregationStrategy = AggregationStrategy.REASONER
+    ) -> str:
+        """Async version of aggregate_responses"""
+        output = self._local_aggregation(completed_tasks, strategy)
+        if output is not None:
+            return output
+        chain = self.fast_aggregator_chain if strategy == AggregationStrategy.FAST else self.response_aggregator_chain
+        result = await chain.ainvoke({
+            "query": query,
+            "agent_responses": self._format_agent_responses(completed_tasks)
         })
         
         return result.content
 
 # LangGraph implementation
-def create_framework_manager_graph(llm: BaseChatModel):
+def create_framework_manager_graph(
+    llm: BaseChatModel,
+    mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+    manager: Optional[FrameworkManagerAgent] = None,
+    speculative: bool = False
+):
     # Create the manager agent
-    manager = FrameworkManagerAgent(llm)
+    if manager is None:
+        manager = FrameworkManagerAgent(llm)
     
-    # Define graph nodes
-    def initialize(state: ManagerState) -> ManagerState:
-        """Initialize the state by determining which agents are needed"""
-        required_agents = manager.determine_required_agents(state["original_query"])
-        
-        # Create tasks for each required agent
+    def log(*args):
+        """Progress output, skipped in lean mode"""
+        if mode != ExecutionMode.LEAN:
+            print(*args)
+    
+    # State helpers shared by the sync and async versions of each node
+    def initialized_state(
+        state: ManagerState,
+        required_agents: Set[AgentId],
+        results: Optional[Dict[AgentId, dict]] = None
+    ) -> ManagerState:
+        """Create tasks for each required agent, completing those already answered speculatively"""
+        results = results or {}
         tasks = [
             AgentTask(
                 agent_type=agent_type,
@@ -146,139 +657,448 @@ def create_framework_manager_graph(llm: BaseChatModel):
             )
             for agent_type in required_agents
         ]
+        tasks = [
+            record_result(task, results[task.agent_type]) if task.agent_type in results else task
+            for task in tasks
+        ]
         
-        new_state =  {
-            **state,
+        # Nodes return only the keys they change: returning the whole state would re-append
+        # messages through operator.add and re-merge every task on every step
+        new_state = {
             "tasks": tasks,
             "required_agents": required_agents,
             "current_agent": None
         }
         # print("[Initialize] State after initialization:", new_state)
         return new_state
-
     
-    def select_next_agent(state: ManagerState) -> ManagerState:
-        """Select the next agent to process the query"""
-        for task in state["tasks"]:
-            if task.status == TaskStatus.PENDING:
-                new_state = {**state, "current_agent": task.agent_type}
-                print(f"[Select Next Agent] Selected agent: {task.agent_type}")
-                return new_state
-        
-        # If no pending tasks, set current_agent to None
-        return {
-            **state,
-            "current_agent": None
+    def policy_of(state: ManagerState) -> CompletionPolicy:
+        return state["policy"] or CompletionPolicy()
+    
+    def current_task(state: ManagerState) -> AgentTask:
+        return state["tasks"].get(state["current_agent"])
+    
+    def pending_tasks(state: ManagerState) -> List[AgentTask]:
+        return state["tasks"].with_status(TaskStatus.PENDING)
+    
+    def completed_tasks(state: ManagerState) -> List[AgentTask]:
+        return state["tasks"].with_status(TaskStatus.COMPLETED)
+    
+    def completed_count(state: ManagerState) -> int:
+        return state["tasks"].count(TaskStatus.COMPLETED)
+    
+    def finalized_state(
+        state: ManagerState,
+        final_output: str,
+        tokens_saved: int = 0,
+        decision: Optional[TierDecision] = None
+    ) -> Dict:
+        message = [AIMessage(content=f"Query processed. Here's the answer:\n\n{final_output}")]
+        result = {
+            "final_output": final_output,
+            "tokens_saved": tokens_saved,
+            "aggregation": decision.strategy if decision is not None else None,
+            "aggregation_reason": decision.reason if decision is not None else None,
+            "messages": message,  # This will be properly combined with existing messages via operator.add
+            # Tasks the policy stopped waiting for before they were dispatched are stragglers too
+            "tasks": [record_result(task, timed_out_result()) for task in pending_tasks(state)]
         }
+        log("[Finalize] Final output:", final_output)
+        return result
     
-    def process_with_agent(state: ManagerState) -> ManagerState:
-        """Process the query with the current agent"""
-        if state["current_agent"] is None:
-            return state
-        
-        # Find the current task
-        current_task = next(task for task in state["tasks"] if task.agent_type == state["current_agent"])
+    def chunk_listener() -> ChunkListener:
+        """Forward text streamed by agents to graph.stream(..., stream_mode="custom") consumers.
         
-        # Process with the appropriate agent
-        result = manager.process_with_agent(current_task.agent_type, current_task.query)
-        
-        if result["success"]:
-            current_task.response = result["result"]
-            current_task.status = TaskStatus.COMPLETED
-        else:
-            current_task.error = result["error"]
-            current_task.status = TaskStatus.FAILED
-        
-        # Update the tasks list
-        updated_tasks = [
-            task if task.agent_type != current_task.agent_type else current_task
-            for task in state["tasks"]
-        ]
+        Graph state only changes when a node returns, so these events are how partial text is seen
+        live; the task itself keeps the text only if its agent fails or times out before finishing.
+        """
+        writer = get_stream_writer()
+        return lambda agent_type, delta: writer({"agent": str(agent_type), "delta": delta})
+    
+    def prepare_aggregation(state: ManagerState, completed: List[AgentTask]) -> Tuple[TierDecision, List[AgentTask], int]:
+        """Pick the aggregation strategy and, for LLM synthesis, fit the responses to the token budget"""
+        decision = manager.choose_aggregation(state["original_query"], completed, policy_of(state), state["started_at"])
+        log(f"[Finalize] Aggregation strategy: {decision.describe()}")
+        if decision.strategy not in (AggregationStrategy.FAST, AggregationStrategy.REASONER):
+            return decision, completed, 0
+        completed, packing = manager.pack_responses(completed)
+        log(f"[Finalize] Aggregator input: {packing.tokens_before} -> {packing.tokens_after} tokens "
+            f"({packing.tokens_saved} saved, trimmed: {packing.trimmed})")
+        return decision, completed, packing.tokens_saved
+    
+    # Handle case where no agents provided successful responses
+    no_response_output = "Unable to provide a response as all specialized agents encountered errors."
+    
+    # Define graph nodes
+    def initialize(state: ManagerState) -> ManagerState:
+        """Initialize the state by determining which agents are needed"""
+        if speculative:
+            speculation = manager.speculative_process(
+                state["original_query"], policy_of(state), state["started_at"], chunk_listener(), log
+            )
+            return initialized_state(state, *speculation)
+        required_agents = manager.determine_required_agents(state["original_query"])
+        return initialized_state(state, required_agents)
+    
+    async def ainitialize(state: ManagerState) -> ManagerState:
+        if speculative:
+            speculation = await manager.aspeculative_process(
+                state["original_query"], policy_of(state), state["started_at"], chunk_listener(), log
+            )
+            return initialized_state(state, *speculation)
+        required_agents = await manager.adetermine_required_agents(state["original_query"])
+        return initialized_state(state, required_agents)
+    
+    def select_next_agent(state: ManagerState) -> Dict:
+        """Select the next agent to process the query"""
+        task = state["tasks"].next_pending()
+        if task is not None:
+            log(f"[Select Next Agent] Selected agent: {task.agent_type}")
+            return {"current_agent": task.agent_type}
         
-        new_state = {
-            **state,
-            "tasks": updated_tasks
-        }
-        return new_state
+        # If no pending tasks, set current_agent to None
+        return {"current_agent": None}
+    
+    def process_with_agent(state: ManagerState) -> Dict:
+        """Process the query with the current agent, bounded by the request's deadline"""
+        tasks = manager.process_tasks(
+            [current_task(state)], policy_of(state), state["started_at"], completed_count(state), chunk_listener()
+        )
+        return {"tasks": tasks}
+    
+    async def aprocess_with_agent(state: ManagerState) -> Dict:
+        tasks = await manager.aprocess_tasks(
+            [current_task(state)], policy_of(state), state["started_at"], completed_count(state), chunk_listener()
+        )
+        return {"tasks": tasks}
+    
+    def process_agent_tasks(state: ManagerState) -> Dict:
+        """Process every pending task at once, stopping early when the policy is satisfied"""
+        tasks = pending_tasks(state)
+        log(f"[Process Agent Tasks] Dispatching {len(tasks)} agents")
+        return {"tasks": manager.process_tasks(
+            tasks, policy_of(state), state["started_at"], completed_count(state), chunk_listener()
+        )}
+    
+    async def aprocess_agent_tasks(state: ManagerState) -> Dict:
+        tasks = pending_tasks(state)
+        log(f"[Process Agent Tasks] Dispatching {len(tasks)} agents")
+        return {"tasks": await manager.aprocess_tasks(
+            tasks, policy_of(state), state["started_at"], completed_count(state), chunk_listener()
+        )}
     
     def should_continue(state: ManagerState) -> str:
         """Determine if there are more agents to process or if we're done"""
-        if state["current_agent"] is None and all(task.status != TaskStatus.PENDING for task in state["tasks"]):
-            print("[Should Continue] No pending tasks, finishing workflow.")
+        if policy_of(state).is_satisfied(completed_count(state), state["started_at"]):
+            log("[Should Continue] Completion policy satisfied, finishing workflow.")
             return "finish"
-        print("[Should Continue] There are still pending tasks, continuing workflow.")
+        if state["current_agent"] is None and state["tasks"].count(TaskStatus.PENDING) == 0:
+            log("[Should Continue] No pending tasks, finishing workflow.")
+            return "finish"
+        log("[Should Continue] There are still pending tasks, continuing workflow.")
         return "continue"
     
     def finalize(state: ManagerState) -> Dict:
         """Create the final output by aggregating responses"""
-        completed_tasks = [task for task in state["tasks"] if task.status == TaskStatus.COMPLETED]
-        print("[Finalize] Completed tasks:", [(t.agent_type, t.status) for t in completed_tasks])
-        
-        # Handle case where no agents provided successful responses
-        if not completed_tasks:
-            final_output = "Unable to provide a response as all specialized agents encountered errors."
-        else:
-            final_output = manager.aggregate_responses(state["original_query"], completed_tasks)
-        
-        message = [AIMessage(content=f"Query processed. Here's the answer:\n\n{final_output}")]
-        result = {
-            "final_output": final_output,
-            "messages": message  # This will be properly combined with existing messages via operator.add
-        }
-        print("[Finalize] Final output:", final_output)
-        return result
+        completed = completed_tasks(state)
+        log("[Finalize] Completed tasks:", [(t.agent_type, t.status) for t in completed])
+        if not completed:
+            return finalized_state(state, no_response_output)
+        decision, completed, tokens_saved = prepare_aggregation(state, completed)
+        output = manager.aggregate_responses(state["original_query"], completed, decision.strategy)
+        return finalized_state(state, output, tokens_saved, decision)
+    
+    async def afinalize(state: ManagerState) -> Dict:
+        completed = completed_tasks(state)
+        log("[Finalize] Completed tasks:", [(t.agent_type, t.status) for t in completed])
+        if not completed:
+            return finalized_state(state, no_response_output)
+        decision, completed, tokens_saved = prepare_aggregation(state, completed)
+        output = await manager.aaggregate_responses(state["original_query"], completed, decision.strategy)
+        return finalized_state(state, output, tokens_saved, decision)
+    
+    def run_request(state: ManagerState) -> Dict:
+        """Lean mode: select, process and finalize in one node, so the request is one superstep"""
+        update = initialize(state)
+        view = {**state, **update, "tasks": TaskLedger(update["tasks"])}
+        merge_tasks(view["tasks"], process_agent_tasks(view)["tasks"])
+        final = finalize(view)
+        merge_tasks(view["tasks"], final.pop("tasks"))
+        return {**update, **final, "tasks": list(view["tasks"])}
+    
+    async def arun_request(state: ManagerState) -> Dict:
+        update = await ainitialize(state)
+        view = {**state, **update, "tasks": TaskLedger(update["tasks"])}
+        merge_tasks(view["tasks"], (await aprocess_agent_tasks(view))["tasks"])
+        final = await afinalize(view)
+        merge_tasks(view["tasks"], final.pop("tasks"))
+        return {**update, **final, "tasks": list(view["tasks"])}
     
     # Build the graph
     workflow = StateGraph(ManagerState)
     
-    # Add nodes
-    workflow.add_node("initialize", initialize)
-    workflow.add_node("select_next_agent", select_next_agent)
-    workflow.add_node("process_with_agent", process_with_agent)
-    workflow.add_node("finalize", finalize)
-    
-    # Add edges
-    workflow.add_edge("initialize", "select_next_agent")
-    # workflow.add_edge("select_next_agent", "process_with_agent")
-    workflow.add_edge("process_with_agent", "select_next_agent")
-    workflow.add_conditional_edges(
-        "select_next_agent",
-        should_continue,
-        {
-            "continue": "process_with_agent",
-            "finish": "finalize"
-        }
-    )
+    if mode == ExecutionMode.LEAN:
+        workflow.add_node("run_request", RunnableLambda(run_request, afunc=arun_request))
+        workflow.add_edge("run_request", END)
+        workflow.set_entry_point("run_request")
+        return workflow.compile()
+    
+    # Add nodes; each node runs its sync function under invoke and its async one under ainvoke
+    workflow.add_node("initialize", RunnableLambda(initialize, afunc=ainitialize))
+    workflow.add_node("finalize", RunnableLambda(finalize, afunc=afinalize))
+    
+    if mode == ExecutionMode.PARALLEL:
+        # One node owns every in-flight call so it can stop waiting once the policy is satisfied.
+        # This layout takes the same three supersteps however many agents are registered.
+        workflow.add_node("process_agent_tasks", RunnableLambda(process_agent_tasks, afunc=aprocess_agent_tasks))
+        workflow.add_edge("initialize", "process_agent_tasks")
+        workflow.add_edge("process_agent_tasks", "finalize")
+    else:
+        workflow.add_node("select_next_agent", select_next_agent)
+        workflow.add_node("process_with_agent", RunnableLambda(process_with_agent, afunc=aprocess_with_agent))
+        
+        # Add edges
+        workflow.add_edge("initialize", "select_next_agent")
+        # workflow.add_edge("select_next_agent", "process_with_agent")
+        workflow.add_edge("process_with_agent", "select_next_agent")
+        workflow.add_conditional_edges(
+            "select_next_agent",
+            should_continue,
+            {
+                "continue": "process_with_agent",
+                "finish": "finalize"
+            }
+        )
     workflow.add_edge("finalize", END)
     
     # Set the entry point
     workflow.set_entry_point("initialize")
     
     # Compile the graph
-    return workflow.compile()
+    graph = workflow.compile()
+    if mode == ExecutionMode.SEQUENTIAL:
+        # The loop takes two supersteps per agent, more than LangGraph's default limit of 25 allows
+        # for a dozen agents, so size the limit from the registry
+        graph = graph.with_config(recursion_limit=max(25, 2 * len(manager.framework_agents) + 10))
+    return graph
 
-# Example usage
-def run_framework_manager(query: str, llm: BaseChatModel):
-    graph = create_framework_manager_graph(llm)
-    
-    # Create initial state with all required fields
-    initial_state = {
+def initial_manager_state(query: str, policy: Optional[CompletionPolicy] = None) -> ManagerState:
+    """Create initial state with all required fields"""
+    return {
         "original_query": query,
+        "policy": policy,
+        "started_at": time.monotonic(),
         "messages": [HumanMessage(content=query)],
-        "tasks": [],
+        "tasks": TaskLedger(),
         "required_agents": set(),
         "current_agent": None,
+        "tokens_saved": 0,
+        "aggregation": None,
+        "aggregation_reason": None,
         "final_output": ""  # Use an empty string instead of None
     }
+
+# Strategies an answer may be cached with: the full-quality ones, as any caller would get them
+CACHEABLE_AGGREGATIONS = (AggregationStrategy.PASSTHROUGH, AggregationStrategy.REASONER)
+
+def cacheable_answer(result: ManagerState) -> Optional[dict]:
+    """The part of a final state worth caching, or None when it depended on the request.
+
+    Answers missing an agent, or aggregated with a cheaper or forced strategy because of the
+    request's latency budget or policy, are not served to other callers.
+    """
+    tasks = list(result["tasks"])
+    if not tasks or any(task.status != TaskStatus.COMPLETED for task in tasks):
+        return None
+    if result.get("aggregation") not in CACHEABLE_AGGREGATIONS or result.get("aggregation_reason") == "override":
+        return None
+    return {
+        "final_output": result["final_output"],
+        "tasks": [task.model_dump(mode="json") for task in tasks],
+        "aggregation": result["aggregation"].value
+    }
+
+def state_from_cached_answer(query: str, policy: Optional[CompletionPolicy], answer: dict) -> ManagerState:
+    """Final state for a query answered from the answer cache"""
+    tasks = TaskLedger(AgentTask.model_validate(task) for task in answer["tasks"])
+    return {
+        **initial_manager_state(query, policy),
+        "tasks": tasks,
+        "required_agents": {task.agent_type for task in tasks},
+        "aggregation": AggregationStrategy(answer["aggregation"]),
+        "aggregation_reason": "cached",
+        "final_output": answer["final_output"]
+    }
+
+# Example usage
+def run_framework_manager(
+    query: str,
+    llm: BaseChatModel,
+    mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+    policy: Optional[CompletionPolicy] = None
+):
+    graph = create_framework_manager_graph(llm, mode)
     
     # Run the graph
-    result = graph.invoke(initial_state)
+    result = graph.invoke(initial_manager_state(query, policy))
     
     return result
 
-async def query_manager_agent(query: str, deepseek_llm="deepseek-reasoner"):
-    llm = ChatDeepSeek(model=deepseek_llm)
-    return run_framework_manager(query, llm)
+async def arun_framework_manager(
+    query: str,
+    llm: BaseChatModel,
+    mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+    policy: Optional[CompletionPolicy] = None
+):
+    """Async version of run_framework_manager; agent and LLM calls never block the event loop"""
+    graph = create_framework_manager_graph(llm, mode)
+    return await graph.ainvoke(initial_manager_state(query, policy))
+
+# Long-lived runtime
+class ManagerRuntime:
+    """Builds the LLM clients, chains and compiled graphs once and reuses them across requests.
+    
+    Nothing request-specific lives on the runtime: all per-query data travels in the graph
+    state, so one runtime can serve any number of concurrent invoke/ainvoke calls.
+    Identical queries that arrive while one is already running share its result when
+    `coalesce` is on, and queries similar enough to an earlier one are answered from
+    `answer_cache` without running the graph.
+    """
+    def __init__(
+        self,
+        deepseek_llm: str = "deepseek-reasoner",
+        manager: Optional[FrameworkManagerAgent] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        coalesce: bool = True,
+        selection_cache: Optional[TTLCache] = None,
+        routing: Optional[RoutingPolicy] = None,
+        answer_cache: Optional[SemanticCache] = None,
+        response_cache: Optional[AgentResponseCache] = None,
+        llm_cache: Optional[LLMResponseCache] = None,
+        aggregation: Optional[AggregationPolicy] = None,
+        token_budget: Optional[TokenBudget] = None,
+        batching: Optional[BatchingPolicy] = None
+    ):
+        if manager is None:
+            # Both models share llm_cache, so selector, repair and aggregator calls are all cached
+            manager = FrameworkManagerAgent(
+                ChatDeepSeek(model=deepseek_llm, cache=llm_cache),
+                selector_llm=ChatDeepSeek(model="deepseek-chat", cache=llm_cache),
+                hedging=hedging,
+                selection_cache=selection_cache,
+                routing=routing,
+                response_cache=response_cache,
+                aggregation=aggregation,
+                token_budget=token_budget,
+                batching=batching
+            )
+        self.manager = manager
+        self.in_flight = SingleFlight() if coalesce else None
+        self.answer_cache = answer_cache
+        if answer_cache is not None and answer_cache.agents_of is None:
+            # Queries naming different agents must not share answers, however alike they are worded
+            keywords = LocalRouter(manager.framework_agents, RoutingPolicy(keyword_rules=True))
+            answer_cache.agents_of = keywords.route_keywords
+        self._graphs = {}
+        self._lock = threading.Lock()
+    
+    def graph(self, mode: ExecutionMode = ExecutionMode.SEQUENTIAL, speculative: bool = False):
+        """Return the compiled graph for the mode, compiling it on first use"""
+        key = (mode, speculative)
+        graph = self._graphs.get(key)
+        if graph is None:
+            with self._lock:
+                graph = self._graphs.get(key)
+                if graph is None:
+                    graph = create_framework_manager_graph(self.manager.llm, mode, manager=self.manager, speculative=speculative)
+                    self._graphs[key] = graph
+        return graph
+    
+    def _flight_key(self, query: str, mode: ExecutionMode, speculative: bool, policy: Optional[CompletionPolicy]) -> tuple:
+        return (normalize_query(query), mode, speculative, policy.model_dump_json() if policy else None)
+    
+    def run(
+        self,
+        query: str,
+        mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+        speculative: bool = False,
+        policy: Optional[CompletionPolicy] = None
+    ):
+        def execute():
+            if self.answer_cache is None:
+                return self.graph(mode, speculative).invoke(initial_manager_state(query, policy))
+            answer = self.answer_cache.get(query)
+            if answer is not None:
+                return state_from_cached_answer(query, policy, answer)
+            result = self.graph(mode, speculative).invoke(initial_manager_state(query, policy))
+            answer = cacheable_answer(result)
+            if answer is not None:
+                self.answer_cache.set(query, answer, (str(task.agent_type) for task in result["tasks"]))
+            return result
+        
+        if self.in_flight is None:
+            return execute()
+        # Callers share one result, so each gets its own copy of the top-level state
+        return dict(self.in_flight.do(self._flight_key(query, mode, speculative, policy), execute))
+    
+    async def arun(
+        self,
+        query: str,
+        mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+        speculative: bool = False,
+        policy: Optional[CompletionPolicy] = None
+    ):
+        async def execute():
+            if self.answer_cache is None:
+                return await self.graph(mode, speculative).ainvoke(initial_manager_state(query, policy))
+            answer = await self.answer_cache.aget(query)
+            if answer is not None:
+                return state_from_cached_answer(query, policy, answer)
+            result = await self.graph(mode, speculative).ainvoke(initial_manager_state(query, policy))
+            answer = cacheable_answer(result)
+            if answer is not None:
+                await self.answer_cache.aset(query, answer, (str(task.agent_type) for task in result["tasks"]))
+            return result
+        
+        if self.in_flight is None:
+            return await execute()
+        return dict(await self.in_flight.ado(self._flight_key(query, mode, speculative, policy), execute))
+
+AGENT_RESPONSE_CACHE_PATH = "agent_responses.db"
+LLM_CACHE_PATH = "llm_responses.db"
+TIER_LOG_PATH = "aggregation_tiers.jsonl"
+
+_runtimes: Dict[str, ManagerRuntime] = {}
+_runtimes_lock = threading.Lock()
+
+def get_manager_runtime(deepseek_llm: str = "deepseek-reasoner") -> ManagerRuntime:
+    """Return the process-wide runtime for the aggregator model, creating it on first use"""
+    with _runtimes_lock:
+        runtime = _runtimes.get(deepseek_llm)
+        if runtime is None:
+            runtime = ManagerRuntime(
+                deepseek_llm,
+                selection_cache=TTLCache(),
+                routing=default_routing_policy(),
+                response_cache=AgentResponseCache(SQLiteStore(AGENT_RESPONSE_CACHE_PATH, max_bytes=256 * 1024 * 1024)),
+                aggregation=AggregationPolicy(tier_log=TIER_LOG_PATH),
+                # Only applies to agents configured with a batch endpoint
+                batching=BatchingPolicy(),
+                llm_cache=LLMResponseCache(SQLiteStore(LLM_CACHE_PATH, max_bytes=256 * 1024 * 1024))
+            )
+            _runtimes[deepseek_llm] = runtime
+        return runtime
+
+async def query_manager_agent(
+    query: str,
+    deepseek_llm="deepseek-reasoner",
+    mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+    speculative: bool = False,
+    policy: Optional[CompletionPolicy] = None
+):
+    # Building the runtime loads models and caches from disk, so the first call does it off the loop
+    runtime = await asyncio.to_thread(get_manager_runtime, deepseek_llm)
+    return await runtime.arun(query, mode, speculative, policy)
 
 # # Example execution
 # if __name__ == "__main__":    
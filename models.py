@@ -1,7 +1,8 @@
 # Models for state management
 from enum import Enum
 import operator
-from typing import Annotated, List, Optional, Set, TypedDict
+import time
+from typing import Annotated, Dict, Iterable, Iterator, List, Optional, Set, TypedDict, Union
 from pydantic import BaseModel, Field
 from langchain_core.messages import BaseMessage
 
@@ -10,31 +11,191 @@ class AgentType(str, Enum):
     ELIZAOS = "elizaos"
     TRON = "tron"
     GOOSE = "goose"
+    
+    def __str__(self) -> str:
+        return self.value
+
+# Built-in agents validate to AgentType; any other registered agent is identified by its plain string id
+AgentId = Annotated[Union[AgentType, str], Field(union_mode="left_to_right")]
 
 class TaskStatus(str, Enum):
     PENDING = "pending"
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     FAILED = "failed"
+    TIMED_OUT = "timed_out"  # Still running when the completion policy let finalize proceed
+
+class ExecutionMode(str, Enum):
+    SEQUENTIAL = "sequential"  # One agent per select_next_agent -> process_with_agent loop
+    PARALLEL = "parallel"  # Fan out every task at once and join before finalize
+    LEAN = "lean"  # Parallel work in a single node and superstep, with no progress output
+
+class AggregationStrategy(str, Enum):
+    PASSTHROUGH = "passthrough"  # The single completed response, as is
+    TEMPLATE = "template"  # Responses under per-agent headings, with no LLM call
+    FAST = "fast"  # Synthesis by the fast selector model
+    REASONER = "reasoner"  # Synthesis by the aggregator model
+
+class BalancingStrategy(str, Enum):
+    LEAST_OUTSTANDING = "least_outstanding"  # Replica with the fewest calls in flight
+    EWMA = "ewma"  # Replica with the lowest moving-average latency, scaled by its calls in flight
 
 class AgentTask(BaseModel):
-    agent_type: AgentType
+    agent_type: AgentId
     query: str
     status: TaskStatus = TaskStatus.PENDING
     response: Optional[str] = None
     error: Optional[str] = None
+    partial_response: Optional[str] = None  # Text a streaming agent sent before it failed or timed out
+
+class CompletionPolicy(BaseModel):
+    """Per-request rule for when finalize may run without waiting for every agent.
+    
+    Finalize runs once min_completed agents have completed or deadline_ms has elapsed since
+    the request started, whichever comes first; unset fields impose no limit.
+    """
+    deadline_ms: Optional[int] = Field(default=None, description="Maximum time to wait for agents, from request start")
+    min_completed: Optional[int] = Field(default=None, description="Number of completed agents that is enough to answer")
+    latency_budget_ms: Optional[int] = Field(default=None, description="Total time the caller will wait, from request start; a cheaper aggregation is used when little is left")
+    aggregation: Optional[AggregationStrategy] = Field(default=None, description="Force an aggregation strategy instead of picking one")
+    
+    def remaining(self, started_at: float) -> Optional[float]:
+        """Seconds left before the deadline, or None when there is no deadline"""
+        if self.deadline_ms is None:
+            return None
+        return max(started_at + self.deadline_ms / 1000 - time.monotonic(), 0.0)
+    
+    def budget_remaining(self, started_at: float) -> Optional[float]:
+        """Seconds left of the caller's latency budget, or None when there is no budget"""
+        if self.latency_budget_ms is None:
+            return None
+        return max(started_at + self.latency_budget_ms / 1000 - time.monotonic(), 0.0)
+    
+    def is_satisfied(self, completed: int, started_at: float) -> bool:
+        """Whether finalize may run with the given number of completed agents"""
+        if self.min_completed is not None and completed >= self.min_completed:
+            return True
+        return self.remaining(started_at) == 0.0
+
+class HedgingPolicy(BaseModel):
+    """When to fire a duplicate agent request and how many duplicates are allowed"""
+    percentile: float = Field(default=95.0, description="Hedge once a call runs past this percentile of recent latency")
+    budget: float = Field(default=0.05, description="Maximum fraction of calls that may be hedged")
+    window: int = Field(default=200, description="Number of recent latencies the percentile is taken over")
+    min_samples: int = Field(default=20, description="Latencies needed before any call is hedged")
+
+class RoutingPolicy(BaseModel):
+    """How the local router may answer agent selection before the LLM selector is called"""
+    keyword_rules: bool = Field(default=True, description="Route queries that name agents straight to those agents")
+    model_path: Optional[str] = Field(default=None, description="Classifier saved by `python router.py train`")
+    threshold: float = Field(default=0.9, description="Minimum classifier confidence for every agent's decision")
+    decision_log: Optional[str] = Field(default=None, description="JSONL file LLM selector decisions are appended to")
+
+class AggregationPolicy(BaseModel):
+    """How finalize picks an aggregation strategy when the request does not force one.
+    
+    One response is passed through. Otherwise the query and responses are scored for complexity
+    (see tiering.score_complexity): the reasoner synthesizes at or above reasoner_min_score and the
+    fast model below it. When the latency budget left is shorter than a synthesis is expected to
+    take, the next cheaper strategy is used.
+    """
+    reasoner_min_score: float = Field(default=3.0, description="Complexity score from which the reasoner synthesizes")
+    fast_ms: int = Field(default=8000, description="Expected duration of a fast-model synthesis")
+    reasoner_ms: int = Field(default=45000, description="Expected duration of a reasoner synthesis")
+    tier_log: Optional[str] = Field(default=None, description="JSONL file each aggregation decision is appended to")
+
+class TokenBudget(BaseModel):
+    """Size limit on the agent responses packed into an aggregator prompt"""
+    max_tokens: int = Field(default=6000, description="Tokens all agent responses together may use")
+    encoding: str = Field(default="cl100k_base", description="tiktoken encoding used to count tokens")
+
+class TransportConfig(BaseModel):
+    """Connection pooling and timeouts for agent HTTP calls"""
+    connect_timeout: float = Field(default=5.0, description="Seconds to establish a connection")
+    read_timeout: Optional[float] = Field(
+        default=120.0,
+        description="Seconds to wait for each piece of response data, so a hung agent fails instead of blocking; None waits indefinitely"
+    )
+    pool_maxsize: int = Field(default=64, description="Connections kept per endpoint host")
+    pool_hosts: int = Field(default=16, description="Endpoint hosts the sync transport keeps a pool for")
+    keepalive_expiry: float = Field(default=30.0, description="Seconds an idle async connection is kept open")
+    http2: bool = Field(default=False, description="Multiplex calls over one HTTP/2 connection per host, falling back to HTTP/1.1")
+
+class BatchingPolicy(BaseModel):
+    """Collect concurrent calls to the same agent into one multi-query request"""
+    window_ms: float = Field(default=5.0, description="How long the first call of a batch waits for others to join")
+    max_batch: int = Field(default=32, description="Queries after which a batch is sent without waiting out the window")
+
+class TaskLedger:
+    """The request's tasks indexed by agent id, with O(1) lookups and status transitions.
+    
+    Iterating yields tasks in the order they were first added.
+    """
+    def __init__(self, tasks: Iterable[AgentTask] = ()):
+        self._tasks: Dict[str, AgentTask] = {}
+        # Dicts double as insertion-ordered sets of agent ids per status
+        self._by_status: Dict[TaskStatus, Dict[str, None]] = {status: {} for status in TaskStatus}
+        for task in tasks:
+            self.update(task)
+    
+    def update(self, task: AgentTask):
+        """Add the task or replace the agent's previous task, moving it to its new status"""
+        previous = self._tasks.get(task.agent_type)
+        if previous is not None:
+            del self._by_status[previous.status][task.agent_type]
+        self._tasks[task.agent_type] = task
+        self._by_status[task.status][task.agent_type] = None
+    
+    def get(self, agent_id: AgentId) -> Optional[AgentTask]:
+        return self._tasks.get(agent_id)
+    
+    def with_status(self, status: TaskStatus) -> List[AgentTask]:
+        return [self._tasks[agent_id] for agent_id in self._by_status[status]]
+    
+    def count(self, status: TaskStatus) -> int:
+        return len(self._by_status[status])
+    
+    def next_pending(self) -> Optional[AgentTask]:
+        agent_id = next(iter(self._by_status[TaskStatus.PENDING]), None)
+        return None if agent_id is None else self._tasks[agent_id]
+    
+    def __iter__(self) -> Iterator[AgentTask]:
+        return iter(self._tasks.values())
+    
+    def __len__(self) -> int:
+        return len(self._tasks)
+    
+    def __repr__(self) -> str:
+        return f"TaskLedger({list(self)!r})"
+
+def merge_tasks(left: TaskLedger, right: Iterable[AgentTask]) -> TaskLedger:
+    """Fold task updates into the ledger by agent id, so nodes only return the tasks they changed.
+    
+    The ledger is updated in place: each request starts from its own ledger in the initial state,
+    and copying it on every update would make each step O(number of agents).
+    """
+    if right is left:
+        return left
+    for task in right:
+        left.update(task)
+    return left
 
 class ManagerState(TypedDict):
     original_query: str  # This is set once and never updated
-    tasks: List[AgentTask]
-    required_agents: Set[AgentType]
-    current_agent: Optional[AgentType]
+    tasks: Annotated[TaskLedger, merge_tasks]  # Updates are merged by agent id
+    required_agents: Set[AgentId]
+    current_agent: Optional[AgentId]
+    policy: Optional[CompletionPolicy]  # None waits for every agent
+    started_at: float  # time.monotonic() when the request started, for policy deadlines
     messages: Annotated[List[BaseMessage], operator.add] # Use append semantics for messages
+    tokens_saved: int  # Agent response tokens the token budget kept out of the aggregator prompt
+    aggregation: Optional[AggregationStrategy]  # Strategy finalize used, None before it runs
+    aggregation_reason: Optional[str]  # Why it was chosen (see tiering.TierDecision), or "cached"
     final_output: Annotated[str, operator.add] = "" 
 
 # Agent necessity determination schema
 class RequiredAgent(BaseModel):
-    agent_type: AgentType = Field(description="The type of specialized agent")
+    agent_type: AgentId = Field(description="The type of specialized agent")
     needed: bool = Field(description="Whether this agent is needed to answer the query")
     reason: str = Field(description="Reason why this agent is needed or not needed")
 
@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.prompts import ChatPromptTemplate
+
+class PromptPrefixError(Exception):
+    """A prompt puts fixed instructions where they break the provider's prefix cache"""
+
+class PromptCacheStats(BaseCallbackHandler):
+    """Records the prompt tokens DeepSeek reports as served from its prefix cache, per call and in total.
+
+    Attach it as a callback to the chains or chat models whose calls should be tracked.
+    """
+    run_inline = True  # Cheap bookkeeping; no need to run in an executor under async calls
+
+    def __init__(self, history: int = 1000):
+        self.calls = deque(maxlen=history)
+        self.totals = {"calls": 0, "prompt_tokens": 0, "cache_hit_tokens": 0, "cache_miss_tokens": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _usage(response: LLMResult) -> Dict[str, int]:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if "prompt_cache_hit_tokens" in usage:
+            return {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "cache_hit_tokens": usage["prompt_cache_hit_tokens"],
+                "cache_miss_tokens": usage.get("prompt_cache_miss_tokens", 0)
+            }
+        # Otherwise fall back to the standard usage metadata on the message
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    hit = (metadata.get("input_token_details") or {}).get("cache_read", 0)
+                    return {
+                        "prompt_tokens": metadata["input_tokens"],
+                        "cache_hit_tokens": hit,
+                        "cache_miss_tokens": metadata["input_tokens"] - hit
+                    }
+        return {}
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        usage = self._usage(response)
+        if not usage:  # e.g. answered from the local LLM cache
+            return
+        model = (response.llm_output or {}).get("model_name")
+        with self._lock:
+            self.calls.append({"model": model, **usage})
+            self.totals["calls"] += 1
+            for key, value in usage.items():
+                self.totals[key] += value
+
+    def stats(self) -> dict:
+        with self._lock:
+            prompt_tokens = self.totals["prompt_tokens"]
+            return {
+                **self.totals,
+                "hit_rate": self.totals["cache_hit_tokens"] / prompt_tokens if prompt_tokens else 0.0
+            }
+
+def render(prompt: ChatPromptTemplate, variables: Dict[str, str]) -> List[str]:
+    return [f"{message.type}\n{message.content}" for message in prompt.format_messages(**variables)]
+
+def static_prefix(prompt: ChatPromptTemplate, samples: List[Dict[str, str]]) -> str:
+    """Longest rendered prefix shared by every sample: what the provider can serve from its cache"""
+    renderings = ["\n".join(render(prompt, variables)) for variables in samples]
+    return os.path.commonprefix(renderings)
+
+def check_prompt_prefixes(prompt: ChatPromptTemplate, samples: List[Dict[str, str]], max_label_bytes: int = 64):
+    """Check the prompt keeps every fixed instruction in a prefix that is byte-identical across samples.
+
+    All messages before the last must render identically for every sample, and the last message
+    may hold only the variable content and short labels (at most max_label_bytes of fixed text).
+    Raises PromptPrefixError otherwise; a plain assert would be stripped under python -O.
+    """
+    renderings = [render(prompt, variables) for variables in samples]
+    first = renderings[0]
+    for rendering in renderings[1:]:
+        if rendering[:-1] != first[:-1]:
+            raise PromptPrefixError("Fixed messages differ between samples")
+    empty = render(prompt, {name: "" for name in prompt.input_variables})
+    label_bytes = len(empty[-1].encode())
+    if label_bytes > max_label_bytes:
+        raise PromptPrefixError(
+            f"The variable message carries {label_bytes} bytes of fixed text; move instructions into the prefix"
+        )
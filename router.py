@@ -0,0 +1,285 @@
+import argparse
+import math
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from agents import BaseAgent, default_framework_agents
+from jsonl_log import jsonl_log, read_jsonl
+from models import AgentId, RoutingPolicy
+
+ROUTER_MODEL_PATH = "router_model.npz"
+DECISION_LOG_PATH = "selector_decisions.jsonl"
+
+def default_routing_policy() -> RoutingPolicy:
+    """Keyword rules, the trained classifier when one has been saved, and decision logging for retraining"""
+    return RoutingPolicy(
+        model_path=ROUTER_MODEL_PATH if os.path.exists(ROUTER_MODEL_PATH) else None,
+        decision_log=DECISION_LOG_PATH
+    )
+
+def tokenize(query: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", query.casefold())
+
+def features(tokens: List[str]) -> List[str]:
+    """Unigrams and bigrams of a tokenized query"""
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+class TfidfClassifier:
+    """TF-IDF features with one logistic regression per agent, fit and evaluated with NumPy.
+
+    Each agent's "needed" decision is an independent binary label, so a query can need any subset.
+    """
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, weights: np.ndarray, bias: np.ndarray, agents: List[str]):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights  # (terms, agents)
+        self.bias = bias  # (agents,)
+        self.agents = agents
+
+    def _vectorize(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse L2-normalized TF-IDF vector as (term indices, values)"""
+        counts: Dict[int, int] = {}
+        for term in features(tokenize(query)):
+            index = self.vocabulary.get(term)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[indices]
+        norm = np.linalg.norm(values)
+        return indices, values / norm if norm else values
+
+    def predict_proba(self, query: str) -> np.ndarray:
+        """Probability that each agent in self.agents is needed"""
+        indices, values = self._vectorize(query)
+        logits = values @ self.weights[indices] + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    @classmethod
+    def fit(
+        cls,
+        queries: Sequence[str],
+        labels: np.ndarray,
+        agents: List[str],
+        max_features: int = 5000,
+        epochs: int = 1000,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4
+    ) -> "TfidfClassifier":
+        """Fit on queries and an (n_queries, n_agents) 0/1 label matrix"""
+        document_frequency: Dict[str, int] = {}
+        for query in queries:
+            for term in set(features(tokenize(query))):
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        terms = sorted(document_frequency, key=lambda term: (-document_frequency[term], term))[:max_features]
+        vocabulary = {term: index for index, term in enumerate(terms)}
+        n = len(queries)
+        idf = np.array([math.log((1 + n) / (1 + document_frequency[term])) + 1 for term in terms])
+
+        model = cls(vocabulary, idf, np.zeros((len(terms), len(agents))), np.zeros(len(agents)), agents)
+        x = np.zeros((n, len(terms)))
+        for row, query in enumerate(queries):
+            indices, values = model._vectorize(query)
+            x[row, indices] = values
+
+        # Full-batch gradient descent on the mean binary cross-entropy
+        y = np.asarray(labels, dtype=np.float64)
+        for _ in range(epochs):
+            probabilities = 1.0 / (1.0 + np.exp(-(x @ model.weights + model.bias)))
+            error = (probabilities - y) / n
+            model.weights -= learning_rate * (x.T @ error + l2 * model.weights)
+            model.bias -= learning_rate * error.sum(axis=0)
+        return model
+
+    def save(self, path: str):
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez(
+            path, terms=np.array(terms), idf=self.idf, weights=self.weights,
+            bias=self.bias, agents=np.array(self.agents)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "TfidfClassifier":
+        with np.load(path) as data:
+            vocabulary = {str(term): index for index, term in enumerate(data["terms"])}
+            return cls(vocabulary, data["idf"], data["weights"], data["bias"], [str(agent) for agent in data["agents"]])
+
+class LocalRouter:
+    """Answers agent selection locally when it can, so the LLM selector only sees the hard queries.
+
+    Queries that name agents (by id or keyword) go to exactly those agents. Otherwise the
+    classifier answers when every agent's decision is at least `threshold` confident.
+    route() returns None when neither applies and the LLM selector should decide.
+    """
+    def __init__(self, framework_agents: Dict[AgentId, BaseAgent], policy: RoutingPolicy):
+        self.policy = policy
+        self.agent_ids = {str(agent_id): agent_id for agent_id in framework_agents}
+        self.keywords: Dict[str, AgentId] = {}
+        if policy.keyword_rules:
+            for agent_id, agent in framework_agents.items():
+                for keyword in (str(agent_id).casefold(), *agent.keywords):
+                    self.keywords[keyword] = agent_id
+        self.classifier = TfidfClassifier.load(policy.model_path) if policy.model_path else None
+        self.routed = {"keyword": 0, "classifier": 0, "llm": 0}
+        # Written on a background thread and rotated, so logging never blocks a request
+        self.decision_log = jsonl_log(policy.decision_log) if policy.decision_log else None
+
+    def route_keywords(self, query: str) -> Optional[Set[AgentId]]:
+        named = {self.keywords[token] for token in tokenize(query) if token in self.keywords}
+        return named or None
+
+    def route_classifier(self, query: str) -> Optional[Set[AgentId]]:
+        if self.classifier is None:
+            return None
+        probabilities = self.classifier.predict_proba(query)
+        confidence = np.maximum(probabilities, 1.0 - probabilities)
+        if len(confidence) == 0 or confidence.min() < self.policy.threshold:
+            return None
+        needed = {
+            self.agent_ids[agent] for agent, p in zip(self.classifier.agents, probabilities)
+            if p >= 0.5 and agent in self.agent_ids
+        }
+        return needed or None
+
+    def route(self, query: str) -> Optional[Set[AgentId]]:
+        """Required agents for the query, or None to defer to the LLM selector"""
+        for path, route in (("keyword", self.route_keywords), ("classifier", self.route_classifier)):
+            required_agents = route(query)
+            if required_agents:
+                self.routed[path] += 1
+                return required_agents
+        self.routed["llm"] += 1
+        return None
+
+    def record(self, query: str, required_agents: Set[AgentId], selector_ms: float):
+        """Append an LLM selector decision to the decision log, as training data for the classifier"""
+        if self.decision_log is None:
+            return
+        self.decision_log.write({
+            "query": query,
+            "agents": sorted(str(agent_id) for agent_id in required_agents),
+            "candidates": sorted(self.agent_ids),
+            "selector_ms": round(selector_ms, 1)
+        })
+
+    def stats(self) -> dict:
+        return dict(self.routed)
+
+def read_decisions(path: str) -> List[dict]:
+    """Logged selector decisions, including those rotated out to backup files"""
+    return read_jsonl(path)
+
+def label_matrix(decisions: Iterable[dict], agents: List[str]) -> np.ndarray:
+    return np.array([[agent in decision["agents"] for agent in agents] for decision in decisions], dtype=np.float64)
+
+def percentile(values: List[float], p: float) -> float:
+    return float(np.percentile(values, p)) if values else 0.0
+
+def evaluate(router: LocalRouter, decisions: List[dict]) -> dict:
+    """Compare the router's answers with the logged LLM selector decisions"""
+    paths = {"keyword": [0, 0], "classifier": [0, 0]}  # [answered, agreed with the LLM]
+    local_us = []
+    for decision in decisions:
+        expected = set(decision["agents"])
+        start = time.perf_counter()
+        for path, route in (("keyword", router.route_keywords), ("classifier", router.route_classifier)):
+            required_agents = route(decision["query"])
+            if required_agents:
+                paths[path][0] += 1
+                paths[path][1] += {str(agent_id) for agent_id in required_agents} == expected
+                break
+        local_us.append((time.perf_counter() - start) * 1e6)
+
+    total = len(decisions)
+    answered = sum(count for count, _ in paths.values())
+    selector_ms = [decision["selector_ms"] for decision in decisions if "selector_ms" in decision]
+    return {
+        "queries": total,
+        "coverage": answered / total if total else 0.0,
+        "accuracy": sum(agreed for _, agreed in paths.values()) / answered if answered else 0.0,
+        **{f"{path}_routed": count for path, (count, _) in paths.items()},
+        **{f"{path}_accuracy": agreed / count if count else 0.0 for path, (count, agreed) in paths.items()},
+        "local_p50_us": percentile(local_us, 50),
+        "local_p99_us": percentile(local_us, 99),
+        "selector_p50_ms": percentile(selector_ms, 50),
+        "selector_p99_ms": percentile(selector_ms, 99),
+        # Selector time no longer spent, on average per query, for the queries answered locally
+        "saved_ms_per_query": (sum(selector_ms) / len(selector_ms)) * answered / total if selector_ms and total else 0.0
+    }
+
+def print_report(report: dict):
+    print(f"Queries:            {report['queries']}")
+    print(f"Answered locally:   {report['coverage']:.1%} "
+          f"(keyword {report['keyword_routed']}, classifier {report['classifier_routed']})")
+    print(f"Agreement with LLM: {report['accuracy']:.1%} "
+          f"(keyword {report['keyword_accuracy']:.1%}, classifier {report['classifier_accuracy']:.1%})")
+    print(f"Local router:       p50 {report['local_p50_us']:.0f}us  p99 {report['local_p99_us']:.0f}us")
+    print(f"LLM selector:       p50 {report['selector_p50_ms']:.0f}ms  p99 {report['selector_p99_ms']:.0f}ms")
+    print(f"Selector time saved: {report['saved_ms_per_query']:.0f}ms per query")
+
+def router_for_decisions(decisions: List[dict], policy: RoutingPolicy) -> LocalRouter:
+    """Router over the agents that appear in the log, using the built-in agents' keywords where known"""
+    agents = default_framework_agents()
+    ids = sorted({agent for decision in decisions for agent in decision.get("candidates", decision["agents"])})
+    registry = {agent_id: agents[agent_id] for agent_id in agents if str(agent_id) in ids}
+    registry.update({agent_id: BaseAgent("", "") for agent_id in ids if agent_id not in registry})
+    return LocalRouter(registry, policy)
+
+def train(args):
+    decisions = read_decisions(args.decisions)
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(decisions))
+    holdout = int(len(decisions) * args.holdout)
+    test = [decisions[i] for i in order[:holdout]]
+    training = [decisions[i] for i in order[holdout:]]
+
+    agents = sorted({agent for decision in decisions for agent in decision.get("candidates", decision["agents"])})
+    start = time.perf_counter()
+    classifier = TfidfClassifier.fit(
+        [decision["query"] for decision in training], label_matrix(training, agents), agents,
+        max_features=args.max_features, epochs=args.epochs
+    )
+    classifier.save(args.output)
+    print(f"Trained on {len(training)} decisions for {len(agents)} agents "
+          f"({len(classifier.vocabulary)} terms) in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+    if test:
+        print(f"\nHeld-out report ({len(test)} decisions, threshold {args.threshold}):")
+        policy = RoutingPolicy(model_path=args.output, threshold=args.threshold)
+        print_report(evaluate(router_for_decisions(decisions, policy), test))
+
+def report(args):
+    decisions = read_decisions(args.decisions)
+    policy = RoutingPolicy(model_path=args.model, threshold=args.threshold, keyword_rules=not args.no_keywords)
+    print_report(evaluate(router_for_decisions(decisions, policy), decisions))
+
+def main():
+    parser = argparse.ArgumentParser(description='Train and evaluate the local agent router')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help='Fit the classifier on logged LLM selector decisions')
+    train_parser.add_argument('decisions', nargs='?', default=DECISION_LOG_PATH)
+    train_parser.add_argument('--output', default=ROUTER_MODEL_PATH)
+    train_parser.add_argument('--holdout', type=float, default=0.2, help='Fraction of decisions kept out for the report')
+    train_parser.add_argument('--threshold', type=float, default=RoutingPolicy().threshold)
+    train_parser.add_argument('--max-features', type=int, default=5000)
+    train_parser.add_argument('--epochs', type=int, default=1000)
+    train_parser.add_argument('--seed', type=int, default=0)
+
+    report_parser = subparsers.add_parser('report', help='Compare a trained router with logged LLM selector decisions')
+    report_parser.add_argument('decisions', nargs='?', default=DECISION_LOG_PATH)
+    report_parser.add_argument('--model', default=ROUTER_MODEL_PATH)
+    report_parser.add_argument('--threshold', type=float, default=RoutingPolicy().threshold)
+    report_parser.add_argument('--no-keywords', action='store_true', help='Evaluate the classifier alone')
+
+    args = parser.parse_args()
+    if args.command == 'train':
+        train(args)
+    else:
+        report(args)
+
+if __name__ == '__main__':
+    main()
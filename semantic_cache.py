@@ -0,0 +1,263 @@
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+NEGATIONS = {"not", "no", "never", "without", "nor", "cannot"}
+
+def negated(query: str) -> bool:
+    """Whether the query contains a negation, which embeddings barely register"""
+    return any(word in NEGATIONS or word.endswith("n't") for word in re.findall(r"[a-z0-9']+", query.casefold()))
+
+class HashingEmbeddings(Embeddings):
+    """Local embedding of word and character trigram counts hashed into a fixed number of dimensions.
+
+    Needs no model or network, and scores reworded queries that share most of their terms as similar.
+    Any other langchain Embeddings can be given to SemanticCache instead.
+    """
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[a-z0-9]+", text.casefold())
+        trigrams = [word[i:i + 3] for word in (f" {w} " for w in words) for i in range(len(word) - 2)]
+        return words + trigrams
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            vector[zlib.crc32(feature.encode()) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+class VectorIndex:
+    """Exact cosine nearest-neighbour search over unit vectors kept in one NumPy matrix.
+
+    Slots freed by remove() are reused, so the matrix only grows to the peak number of entries.
+    """
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self._vectors = np.zeros((16, dimensions), dtype=np.float32)
+        self._live = np.zeros(16, dtype=bool)
+        self._free: List[int] = []
+        self._size = 0  # Slots handed out so far
+
+    def add(self, vector: np.ndarray) -> int:
+        """Store the vector and return its slot"""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                self._live = np.concatenate([self._live, np.zeros_like(self._live)])
+            slot = self._size
+            self._size += 1
+        self._vectors[slot] = vector
+        self._live[slot] = True
+        return slot
+
+    def remove(self, slot: int):
+        self._live[slot] = False
+        self._free.append(slot)
+
+    def _candidates(self, vector: np.ndarray) -> Optional[np.ndarray]:
+        """Slots worth scoring, or None to scan every slot"""
+        return None
+
+    def search(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        """Most similar live slot and its cosine similarity, or (None, 0.0) when empty"""
+        candidates = self._candidates(vector)
+        if candidates is None:
+            scores = self._vectors[:self._size] @ vector
+            scores[~self._live[:self._size]] = -np.inf
+            slots = None
+        else:
+            if len(candidates) == 0:
+                return None, 0.0
+            scores = self._vectors[candidates] @ vector
+            slots = candidates
+        if len(scores) == 0:
+            return None, 0.0
+        best = int(np.argmax(scores))
+        if scores[best] == -np.inf:
+            return None, 0.0
+        return (best if slots is None else int(slots[best])), float(scores[best])
+
+class LSHIndex(VectorIndex):
+    """Approximate search that only scores slots sharing a random-hyperplane hash bucket with the query.
+
+    Each of `tables` hash tables buckets vectors by `bits` hyperplane signs; more tables find more
+    true neighbours, more bits make buckets smaller. Lookups stay fast with millions of entries.
+    """
+    def __init__(self, dimensions: int, tables: int = 16, bits: int = 14, seed: int = 0):
+        super().__init__(dimensions)
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables, bits, dimensions)).astype(np.float32)
+        self._powers = 1 << np.arange(bits, dtype=np.int64)
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(tables)]
+        self._signatures: Dict[int, np.ndarray] = {}
+
+    def _signature(self, vector: np.ndarray) -> np.ndarray:
+        return ((self._planes @ vector) > 0).astype(np.int64) @ self._powers
+
+    def add(self, vector: np.ndarray) -> int:
+        slot = super().add(vector)
+        signature = self._signature(vector)
+        self._signatures[slot] = signature
+        for table, key in zip(self._buckets, signature.tolist()):
+            table.setdefault(key, set()).add(slot)
+        return slot
+
+    def remove(self, slot: int):
+        for table, key in zip(self._buckets, self._signatures.pop(slot).tolist()):
+            bucket = table[key]
+            bucket.discard(slot)
+            if not bucket:
+                del table[key]
+        super().remove(slot)
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        slots = set()
+        for table, key in zip(self._buckets, self._signature(vector).tolist()):
+            slots |= table.get(key, set())
+        return np.fromiter(slots, dtype=np.int64, count=len(slots))
+
+class SemanticEntry(NamedTuple):
+    query: str
+    value: Any
+    agents: Set[str]  # Agents whose responses the value was built from
+    expires_at: float
+
+class SemanticCache:
+    """Cache keyed by query meaning: a lookup hits when a stored query is at least `threshold` similar.
+
+    Entries expire after `ttl` seconds, the least recently used entry is evicted beyond
+    `max_entries`, and invalidate_agent() drops every entry built from a given agent's responses.
+    Set `approximate` to search an LSHIndex instead of scanning every entry.
+
+    Similar wording is not enough for a hit: the two queries must both or neither be negated, and
+    must name the same agents according to `agents_of` (e.g. LocalRouter.route_keywords), so a
+    question about one framework is never answered with another framework's answer.
+    """
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        threshold: float = 0.9,
+        max_entries: int = 10_000,
+        ttl: float = 24 * 3600.0,
+        approximate: bool = False,
+        agents_of: Optional[Callable[[str], Optional[Iterable[Any]]]] = None
+    ):
+        self.embeddings = embeddings if embeddings is not None else HashingEmbeddings()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.approximate = approximate
+        self.agents_of = agents_of  # Agents a query names, or None when it names none
+        self._index: Optional[VectorIndex] = None
+        self._entries: "OrderedDict[int, SemanticEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Embeddings of recent misses, so storing their answer does not embed the query again
+        self._pending: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _new_index(self, dimensions: int) -> VectorIndex:
+        return LSHIndex(dimensions) if self.approximate else VectorIndex(dimensions)
+
+    def _named_agents(self, query: str) -> Set[str]:
+        named = self.agents_of(query) if self.agents_of is not None else None
+        return {str(agent) for agent in named or ()}
+
+    def _matches(self, query: str, entry: SemanticEntry) -> bool:
+        """Whether the entry answers the query, beyond the two being worded alike"""
+        return negated(query) == negated(entry.query) and self._named_agents(query) == self._named_agents(entry.query)
+
+    def _lookup(self, query: str, vector: np.ndarray) -> Optional[Any]:
+        with self._lock:
+            slot, score = (None, 0.0) if self._index is None else self._index.search(vector)
+            entry = self._entries.get(slot) if slot is not None else None
+            if entry is not None and entry.expires_at <= time.time():
+                self._remove(slot)
+                entry = None
+            if entry is None or score < self.threshold or not self._matches(query, entry):
+                self.misses += 1
+                self._pending[query] = vector
+                while len(self._pending) > 1024:
+                    self._pending.popitem(last=False)
+                return None
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return entry.value
+
+    def _store(self, query: str, vector: np.ndarray, value: Any, agents: Iterable[str]):
+        with self._lock:
+            if self._index is None:
+                self._index = self._new_index(len(vector))
+            slot = self._index.add(vector)
+            self._entries[slot] = SemanticEntry(query, value, set(agents), time.time() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, slot: int):
+        del self._entries[slot]
+        self._index.remove(slot)
+
+    @staticmethod
+    def _vector(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _pending_vector(self, query: str) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._pending.pop(query, None)
+
+    def get(self, query: str) -> Optional[Any]:
+        return self._lookup(query, self._vector(self.embeddings.embed_query(query)))
+
+    async def aget(self, query: str) -> Optional[Any]:
+        return self._lookup(query, self._vector(await self.embeddings.aembed_query(query)))
+
+    def set(self, query: str, value: Any, agents: Iterable[str]):
+        vector = self._pending_vector(query)
+        if vector is None:
+            vector = self._vector(self.embeddings.embed_query(query))
+        self._store(query, vector, value, agents)
+
+    async def aset(self, query: str, value: Any, agents: Iterable[str]):
+        vector = self._pending_vector(query)
+        if vector is None:
+            vector = self._vector(await self.embeddings.aembed_query(query))
+        self._store(query, vector, value, agents)
+
+    def invalidate_agent(self, agent_id: str) -> int:
+        """Drop every entry built from the agent's responses, e.g. after the agent is updated; returns the count"""
+        with self._lock:
+            stale = [slot for slot, entry in self._entries.items() if agent_id in entry.agents]
+            for slot in stale:
+                self._remove(slot)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._index = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries)
+        }
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import contextlib
+import json
+from typing import List
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# Stand-in for a framework agent endpoint, for benchmarking the transport without the real agents
+app = FastAPI()
+app.state.latency = 0.0
+app.state.query_latency = 0.0
+app.state.stream_format = "ndjson"
+app.state.slots = None  # Limits requests served at once, like a model server with fixed capacity
+
+class AgentQuery(BaseModel):
+    query: str
+    stream: bool = False
+
+class AgentBatch(BaseModel):
+    queries: List[str]
+
+def response_text(agent: str, query: str) -> str:
+    return f"{agent} response to: {query}"
+
+async def work(queries: int):
+    """Hold a serving slot for the fixed per-request latency plus the per-query cost"""
+    async with app.state.slots or contextlib.nullcontext():
+        delay = app.state.latency + app.state.query_latency * queries
+        if delay:
+            await asyncio.sleep(delay)
+
+async def stream_words(text: str):
+    """Send the answer a word at a time, spreading the latency over the words"""
+    words = text.split(" ")
+    for index, word in enumerate(words):
+        if app.state.latency:
+            await asyncio.sleep(app.state.latency / len(words))
+        event = json.dumps({"delta": word if index == 0 else " " + word})
+        yield f"data: {event}\n\n" if app.state.stream_format == "sse" else event + "\n"
+    if app.state.stream_format == "sse":
+        yield "data: [DONE]\n\n"
+
+@app.post("/{agent}")
+async def answer(agent: str, req: AgentQuery):
+    text = response_text(agent, req.query)
+    if req.stream:
+        media_type = "text/event-stream" if app.state.stream_format == "sse" else "application/x-ndjson"
+        return StreamingResponse(stream_words(text), media_type=media_type)
+    await work(1)
+    return {"result": text}
+
+@app.post("/{agent}/batch")
+async def answer_batch(agent: str, req: AgentBatch):
+    await work(len(req.queries))
+    return {"results": [{"result": response_text(agent, query)} for query in req.queries]}
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a stand-in framework agent endpoint')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering')
+    parser.add_argument('--query-latency', type=float, default=0.0, help='Extra seconds per query answered')
+    parser.add_argument('--slots', type=int, default=None, help='Requests served at once; the rest queue')
+    parser.add_argument('--http2', action='store_true', help='Serve HTTP/2 over cleartext (h2c) with hypercorn')
+    parser.add_argument('--stream-format', choices=['ndjson', 'sse'], default='ndjson',
+                        help='How answers are streamed to callers that ask for it')
+    args = parser.parse_args()
+    app.state.latency = args.latency
+    app.state.query_latency = args.query_latency
+    app.state.slots = asyncio.Semaphore(args.slots) if args.slots else None
+    app.state.stream_format = args.stream_format
+    if args.http2:
+        # uvicorn only speaks HTTP/1.1; hypercorn is needed just for this mode
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+        config = Config()
+        config.bind = [f"{args.host}:{args.port}"]
+        asyncio.run(serve(app, config))
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == '__main__':
+    main()
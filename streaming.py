@@ -0,0 +1,98 @@
+import json
+import threading
+from typing import Callable, Dict, Optional
+
+from models import AgentId
+
+# Response types an agent may stream its answer as; anything else is read as one JSON body
+STREAM_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson", "application/jsonl")
+
+# Called with the agent and each piece of text it streams
+ChunkListener = Callable[[AgentId, str], None]
+
+class AgentStreamError(Exception):
+    """An agent reported an error partway through a streamed answer"""
+
+def is_streamed(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in STREAM_CONTENT_TYPES
+
+class StreamDecoder:
+    """Rebuilds an agent answer from the lines of an SSE or NDJSON response.
+
+    Each event is a JSON object with a "delta" to append, a "result" holding the whole answer,
+    or an "error". SSE events may also carry plain text, and "[DONE]" ends the stream.
+    feed() returns the text each line adds, so callers can pass it on as it arrives.
+    """
+    def __init__(self, content_type: str):
+        self.sse = content_type.split(";")[0].strip().lower() == "text/event-stream"
+        self.text = ""
+        self.done = False
+        self._data = []  # Data lines of the SSE event being read
+
+    def feed(self, line: str) -> str:
+        if not self.sse:
+            return self._apply(line.strip()) if line.strip() else ""
+        if line.startswith("data:"):
+            data = line[5:]
+            self._data.append(data[1:] if data.startswith(" ") else data)
+            return ""
+        if line or not self._data:  # event:, id: and comment lines carry no text
+            return ""
+        payload, self._data = "\n".join(self._data), []
+        return self._apply(payload)
+
+    def finish(self) -> str:
+        """Flush an SSE event the server did not terminate with a blank line"""
+        return self.feed("") if self._data else ""
+
+    def _apply(self, payload: str) -> str:
+        if payload == "[DONE]":
+            self.done = True
+            return ""
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            if not self.sse:
+                raise ValueError(f"Malformed stream line: {payload[:80]}")
+            event = {"delta": payload}
+        if not isinstance(event, dict):
+            raise ValueError(f"Unexpected stream event: {payload[:80]}")
+        if "error" in event:
+            raise AgentStreamError(event["error"])
+        if "result" in event:
+            result = event["result"]
+            delta = result[len(self.text):] if result.startswith(self.text) else ""
+            self.text = result
+            return delta
+        delta = event.get("delta") or ""
+        self.text += delta
+        return delta
+
+class PartialResponses:
+    """Text each agent of a request has streamed so far, forwarded to an optional listener.
+
+    Chunks arriving after close() (e.g. from a losing hedge or a discarded thread) are dropped.
+    """
+    def __init__(self, listener: Optional[ChunkListener] = None):
+        self.listener = listener
+        self._texts: Dict[AgentId, str] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def handler(self, agent_type: AgentId) -> Callable[[str], None]:
+        def on_chunk(delta: str):
+            with self._lock:
+                if self._closed:
+                    return
+                self._texts[agent_type] = self._texts.get(agent_type, "") + delta
+            if self.listener is not None:
+                self.listener(agent_type, delta)
+        return on_chunk
+
+    def get(self, agent_type: AgentId) -> Optional[str]:
+        with self._lock:
+            return self._texts.get(agent_type)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
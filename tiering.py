@@ -0,0 +1,62 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from jsonl_log import jsonl_log
+from models import AggregationStrategy
+
+CODE_PATTERN = re.compile(
+    r"```|\b(code|implement\w*|function|class|script|snippet|program|example|refactor|debug)\b", re.IGNORECASE
+)
+ANALYSIS_PATTERN = re.compile(
+    r"\b(compare|comparison|versus|vs|trade-?offs?|architecture|design|why|pros|cons|step[- ]by[- ]step|optimi[sz]\w*)\b",
+    re.IGNORECASE
+)
+
+class Complexity(NamedTuple):
+    score: float
+    factors: Dict[str, float]  # What contributed to the score, for tuning the threshold
+
+def score_complexity(query: str, responses: List[str]) -> Complexity:
+    """Heuristic cost of synthesizing the responses well: more, longer responses and harder questions score higher"""
+    factors = {}
+    if len(responses) > 1:
+        factors["responses"] = len(responses) - 1.0
+    response_chars = sum(map(len, responses))
+    if response_chars:
+        factors["response_size"] = round(min(response_chars / 4000, 3.0), 2)
+    words = len(query.split())
+    if words > 30:
+        factors["query_length"] = round(min(words / 30, 2.0), 2)
+    if CODE_PATTERN.search(query):
+        factors["code"] = 2.0
+    if ANALYSIS_PATTERN.search(query):
+        factors["analysis"] = 1.0
+    return Complexity(round(sum(factors.values()), 2), factors)
+
+class TierDecision(NamedTuple):
+    strategy: AggregationStrategy
+    reason: str  # single_response, override, budget or complexity
+    complexity: Optional[Complexity] = None
+
+    def describe(self) -> str:
+        if self.complexity is None:
+            return f"{self.strategy.value} ({self.reason})"
+        return f"{self.strategy.value} ({self.reason}, score {self.complexity.score}: {self.complexity.factors})"
+
+class TierLog:
+    """Appends each tier decision to a rotated JSONL file, to tune the complexity threshold from real traffic.
+
+    Writes happen on a background thread, so recording from finalize never blocks the event loop.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._log = jsonl_log(path)
+
+    def record(self, query: str, decision: TierDecision):
+        self._log.write({
+            "query": query,
+            "strategy": decision.strategy.value,
+            "reason": decision.reason,
+            "score": decision.complexity.score if decision.complexity else None,
+            "factors": decision.complexity.factors if decision.complexity else None
+        })
@@ -0,0 +1,114 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a length estimate
+    tiktoken = None
+
+from models import AgentTask, TaskStatus
+
+class TokenCounter:
+    """Counts and truncates by tokens with tiktoken, or estimates from length when no encoding is available"""
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        self.encoding = None
+        if tiktoken is None:
+            print("Warning: tiktoken is not installed, token counts are estimated")
+            return
+        try:
+            self.encoding = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            # The encoding is downloaded on first use, which fails offline
+            print(f"Warning: tiktoken encoding {encoding} unavailable, token counts are estimated: {e}")
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return -(-len(text) // self.CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.encoding is None:
+            return text[:max_tokens * self.CHARS_PER_TOKEN]
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+
+@lru_cache(maxsize=None)
+def token_counter(encoding: str = "cl100k_base") -> TokenCounter:
+    """Shared counter per encoding, so the encoding is loaded once per process"""
+    return TokenCounter(encoding)
+
+def compact(text: str) -> str:
+    """Drop repeated paragraphs and redundant whitespace, which verbose agents produce a lot of"""
+    seen = set()
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = re.sub(r"[ \t]+", " ", paragraph).strip()
+        if paragraph and paragraph not in seen:
+            seen.add(paragraph)
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+def trim(text: str, max_tokens: int, counter: TokenCounter) -> str:
+    """Keep the first max_tokens tokens, cut back to a sentence or line end when one is near"""
+    marker = " [...]"
+    kept = counter.truncate(text, max(max_tokens - counter.count(marker), 0))
+    boundary = max(kept.rfind(". "), kept.rfind(".\n"), kept.rfind("\n"))
+    if boundary > len(kept) * 0.8:
+        kept = kept[:boundary + 1]
+    return kept.rstrip() + marker
+
+def fair_shares(sizes: Dict[str, int], budget: int) -> Dict[str, int]:
+    """Split the budget so no agent gets more than it needs and the rest is divided evenly (max-min fairness)"""
+    shares = {}
+    remaining = dict(sizes)
+    while remaining:
+        share = budget // len(remaining)
+        fits = {key: size for key, size in remaining.items() if size <= share}
+        if not fits:
+            shares.update({key: share for key in remaining})
+            break
+        for key, size in fits.items():
+            shares[key] = size
+            budget -= size
+            del remaining[key]
+    return shares
+
+class PackingReport(NamedTuple):
+    tokens_before: int
+    tokens_after: int
+    trimmed: List[str]  # Agents whose responses were cut to fit their share
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+def pack_responses(completed_tasks: List[AgentTask], max_tokens: int, counter: TokenCounter) -> Tuple[List[AgentTask], PackingReport]:
+    """Fit the completed responses into max_tokens for the aggregator prompt.
+
+    Each agent gets a fair share of the budget. Responses over their share are compacted first,
+    then trimmed if still too long; responses within it are left untouched.
+    """
+    completed = [task for task in completed_tasks if task.status == TaskStatus.COMPLETED]
+    sizes = {str(task.agent_type): counter.count(task.response or "") for task in completed}
+    tokens_before = sum(sizes.values())
+    if tokens_before <= max_tokens:
+        return completed, PackingReport(tokens_before, tokens_before, [])
+
+    shares = fair_shares(sizes, max_tokens)
+    packed, trimmed, tokens_after = [], [], 0
+    for task in completed:
+        key = str(task.agent_type)
+        response, size = task.response or "", sizes[key]
+        if size > shares[key]:
+            response = compact(response)
+            size = counter.count(response)
+            if size > shares[key]:
+                response = trim(response, shares[key], counter)
+                size = counter.count(response)
+                trimmed.append(key)
+            task = task.model_copy(update={"response": response})
+        packed.append(task)
+        tokens_after += size
+    return packed, PackingReport(tokens_before, tokens_after, trimmed)
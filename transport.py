@@ -0,0 +1,195 @@
+import asyncio
+import contextlib
+import threading
+import weakref
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Set, TypeVar, Union
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from models import TransportConfig
+
+HTTP1, H2, H2C = "http/1.1", "h2", "h2c"
+
+# How an h2c attempt fails against an HTTP/1.1-only server: it rejects the HTTP/2 preface,
+# or closes the connection while it is still being written or read
+NO_HTTP2_ERRORS = (httpx.RemoteProtocolError, httpx.WriteError, httpx.ReadError)
+
+T = TypeVar("T")
+
+class AgentTransport:
+    """Keep-alive connection pools for agent calls, shared by every agent that posts through it.
+
+    The sync path uses a requests.Session with one connection pool per endpoint host. The async
+    path uses an httpx.AsyncClient per event loop, since a client's connections belong to the
+    loop that opened them.
+
+    With `http2` set, concurrent calls to a host share one multiplexed HTTP/2 connection: https
+    endpoints negotiate it during the TLS handshake, and plain http endpoints are tried with
+    HTTP/2 prior knowledge (h2c). A host that does not speak HTTP/2 is remembered and served
+    over HTTP/1.1 from then on; once a host has answered over h2c, errors are no longer
+    taken as a sign it lacks HTTP/2.
+    """
+    def __init__(self, config: Optional[TransportConfig] = None):
+        self.config = config or TransportConfig()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.config.pool_hosts, pool_maxsize=self.config.pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._http1_hosts: Set[str] = set()
+        self._http2_hosts: Set[str] = set()  # Hosts that have answered over h2c
+        self._lock = threading.Lock()
+
+    def _protocol(self, url: str) -> str:
+        if not self.config.http2:
+            return HTTP1
+        parts = urlsplit(url)
+        if parts.netloc in self._http1_hosts:
+            return HTTP1
+        return H2 if parts.scheme == "https" else H2C
+
+    def _confirm_http2(self, url: str):
+        host = urlsplit(url).netloc
+        if host not in self._http2_hosts:
+            with self._lock:
+                self._http2_hosts.add(host)
+
+    def _falls_back(self, url: str, error: Exception) -> bool:
+        """Whether a failed h2c attempt means the host lacks HTTP/2 rather than a real failure"""
+        return isinstance(error, NO_HTTP2_ERRORS) and urlsplit(url).netloc not in self._http2_hosts
+
+    def _fall_back(self, url: str, error: Exception):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host in self._http1_hosts:
+                return
+            self._http1_hosts.add(host)
+        print(f"Warning: {host} does not accept HTTP/2, using HTTP/1.1: {error}")
+
+    def _client_options(self, protocol: str) -> dict:
+        return {
+            "timeout": httpx.Timeout(self.config.read_timeout, connect=self.config.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=self.config.pool_maxsize,
+                keepalive_expiry=self.config.keepalive_expiry
+            ),
+            "http1": protocol != H2C,
+            "http2": protocol != HTTP1
+        }
+
+    def _client(self, protocol: str) -> httpx.Client:
+        client = self._clients.get(protocol)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(protocol)
+                if client is None:
+                    client = self._clients[protocol] = httpx.Client(**self._client_options(protocol))
+        return client
+
+    def _send(self, url: str, send: Callable[[str], T]) -> T:
+        """Call send with the host's protocol, retrying over HTTP/1.1 when an h2c attempt is rejected"""
+        protocol = self._protocol(url)
+        if protocol == H2C:
+            try:
+                response = send(H2C)
+            except httpx.TransportError as e:
+                if not self._falls_back(url, e):
+                    raise
+                self._fall_back(url, e)
+                return send(HTTP1)
+            self._confirm_http2(url)
+            return response
+        return send(protocol)
+
+    def post(self, url: str, headers: dict, payload: dict) -> Union[requests.Response, httpx.Response]:
+        def send(protocol: str):
+            if protocol == HTTP1:
+                return self.session.post(
+                    url, headers=headers, json=payload, timeout=(self.config.connect_timeout, self.config.read_timeout)
+                )
+            return self._client(protocol).post(url, headers=headers, json=payload)
+        return self._send(url, send)
+
+    @contextlib.contextmanager
+    def stream(self, url: str, headers: dict, payload: dict) -> Iterator[httpx.Response]:
+        """POST and yield the response once its headers arrive, so the body can be read as it streams in"""
+        def send(protocol: str) -> httpx.Response:
+            client = self._client(protocol)
+            return client.send(client.build_request("POST", url, headers=headers, json=payload), stream=True)
+        response = self._send(url, send)
+        try:
+            yield response
+        finally:
+            response.close()
+
+    def _async_client(self, protocol: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.get(loop) or {}
+        client = clients.get(protocol)
+        if client is None:
+            with self._lock:
+                clients = self._async_clients.setdefault(loop, {})
+                client = clients.get(protocol)
+                if client is None:
+                    client = clients[protocol] = httpx.AsyncClient(**self._client_options(protocol))
+        return client
+
+    async def _asend(self, url: str, send: Callable[[str], Awaitable[T]]) -> T:
+        protocol = self._protocol(url)
+        if protocol == H2C:
+            try:
+                response = await send(H2C)
+            except httpx.TransportError as e:
+                if not self._falls_back(url, e):
+                    raise
+                self._fall_back(url, e)
+                return await send(HTTP1)
+            self._confirm_http2(url)
+            return response
+        return await send(protocol)
+
+    async def apost(self, url: str, headers: dict, payload: dict) -> httpx.Response:
+        return await self._asend(url, lambda protocol: self._async_client(protocol).post(url, headers=headers, json=payload))
+
+    @contextlib.asynccontextmanager
+    async def astream(self, url: str, headers: dict, payload: dict) -> AsyncIterator[httpx.Response]:
+        """Async version of stream"""
+        def send(protocol: str) -> Awaitable[httpx.Response]:
+            client = self._async_client(protocol)
+            return client.send(client.build_request("POST", url, headers=headers, json=payload), stream=True)
+        response = await self._asend(url, send)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    def close(self):
+        self.session.close()
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+    async def aclose(self):
+        """Close the running loop's async clients"""
+        clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+_default_transport: Optional[AgentTransport] = None
+_default_lock = threading.Lock()
+
+def default_transport() -> AgentTransport:
+    """The process-wide transport agents use unless given their own"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = AgentTransport()
+        return _default_transport